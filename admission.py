@@ -0,0 +1,188 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from llm import MAX_IN_FLIGHT
+from metrics import metrics, span
+
+# 🔹 Admission control in front of the LLM-backed commands: token buckets per
+# user and per guild, then a bounded queue served round-robin by user, with
+# cheap commands ahead of expensive ones. When the queue can't be cleared
+# inside the latency budget, new work is turned away instead of piling up.
+MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", str(MAX_IN_FLIGHT)))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+LATENCY_BUDGET = float(os.getenv("ADMISSION_LATENCY_BUDGET", "20"))  # seconds a request may wait
+USER_RATE, USER_BURST = 1 / 10, 3    # one request per 10s, bursts of 3
+GUILD_RATE, GUILD_BURST = 1.0, 20    # one request per second across a guild, bursts of 20
+SERVICE_TIME_GUESS = 3.0             # seconds per request until we've measured some
+BUCKET_PRUNE_AT = 10_000
+
+CHEAP, EXPENSIVE = 0, 1  # queue priorities; cheap work is served first
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason  # "user_rate", "guild_rate", "overloaded" or "timeout" (max_wait ran out)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now=None, cost=1.0) -> bool:
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def refund(self, cost=1.0):
+        self.tokens = min(self.burst, self.tokens + cost)
+
+    def full(self, now) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Waiter:
+    __slots__ = ("future", "enqueued")
+
+    def __init__(self, future):
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, max_active=MAX_ACTIVE, max_queue=MAX_QUEUE, latency_budget=LATENCY_BUDGET,
+                 user_rate=USER_RATE, user_burst=USER_BURST, guild_rate=GUILD_RATE, guild_burst=GUILD_BURST):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.latency_budget = latency_budget
+        self.user_limits = (user_rate, user_burst)
+        self.guild_limits = (guild_rate, guild_burst)
+        self.active = 0
+        self.depth = 0
+        self.service_time = SERVICE_TIME_GUESS  # moving average of how long a slot is held
+        self._queues = (OrderedDict(), OrderedDict())  # per priority: user -> deque of waiters
+        self._user_buckets = {}
+        self._guild_buckets = {}
+
+    def _bucket(self, buckets, key, limits):
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= BUCKET_PRUNE_AT:
+                # Full buckets hold no state worth keeping; a new one starts full anyway.
+                now = time.monotonic()
+                for stale in [k for k, b in buckets.items() if b.full(now)]:
+                    del buckets[stale]
+            bucket = buckets[key] = TokenBucket(*limits)
+        return bucket
+
+    def _check_rates(self, user_id, guild_id):
+        now = time.monotonic()
+        user = self._bucket(self._user_buckets, user_id, self.user_limits)
+        if not user.take(now):
+            raise Rejected("user_rate")
+        if guild_id is not None and not self._bucket(self._guild_buckets, guild_id, self.guild_limits).take(now):
+            user.refund()  # the guild said no, so don't hold it against the user
+            raise Rejected("guild_rate")
+
+    def expected_wait(self) -> float:
+        return (self.depth + 1) / self.max_active * self.service_time
+
+    def _publish(self):
+        metrics.set("quintin_admission_queue_depth", self.depth)
+        metrics.set("quintin_admission_active", self.active)
+
+    def _next_waiter(self):
+        # Cheap work first; within a priority, one waiter per user in turn.
+        for queue in self._queues:
+            while queue:
+                user, waiters = next(iter(queue.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    queue.move_to_end(user)
+                else:
+                    del queue[user]
+                if not waiter.future.done():  # skip callers that gave up
+                    return waiter
+        return None
+
+    def _dispatch(self):
+        while self.active < self.max_active:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self.depth -= 1
+            if time.monotonic() - waiter.enqueued > self.latency_budget:
+                waiter.future.set_exception(Rejected("overloaded"))
+                continue
+            self.active += 1
+            waiter.future.set_result(None)
+        self._publish()
+
+    async def _acquire(self, user_id, priority, max_wait=None):
+        if self.active < self.max_active and not self.depth:
+            self.active += 1
+            self._publish()
+            return
+        if self.depth >= self.max_queue or self.expected_wait() > self.latency_budget:
+            raise Rejected("overloaded")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(user_id, deque()).append(waiter)
+        self.depth += 1
+        self._publish()
+        try:
+            await asyncio.wait_for(waiter.future, max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return  # handed a slot in the same tick the wait ran out (3.12+); _dispatch already counted it
+            self.depth -= 1  # wait_for cancelled the future, so _next_waiter skips it
+            self._publish()
+            raise Rejected("timeout") from None
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release()  # a slot was handed over just as we were cancelled
+            else:
+                self.depth -= 1  # still queued; _next_waiter skips it
+                self._publish()
+            raise
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, user_id, guild_id=None, command="unknown", priority=EXPENSIVE, max_wait=None):
+        # max_wait: seconds this caller will queue before it would rather do something else.
+        try:
+            self._check_rates(user_id, guild_id)
+            with span("queue"):
+                await self._acquire(user_id, priority, max_wait)
+        except Rejected as e:
+            metrics.inc("quintin_admission_total", command=command, result=e.reason)
+            raise
+        metrics.inc("quintin_admission_total", command=command, result="admitted")
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - started)
+            self._release()
+
+
+admission = AdmissionController()
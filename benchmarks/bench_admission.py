@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from admission import CHEAP, EXPENSIVE, AdmissionController, Rejected  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAI  # noqa: E402
+from llm import CompletionService  # noqa: E402
+
+# 🔹 A simulated burst in one busy channel: one spammer firing everything at
+# once plus a crowd of regulars asking a couple of things each, with and
+# without the admission controller in front of the LLM.
+GUILD = 1
+SPAMMER = 0
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+
+def make_burst(args):
+    # (start offset, user, priority); the spammer fires everything in the first half second.
+    requests = [(random.uniform(0, 0.5), SPAMMER, random.choice((CHEAP, EXPENSIVE))) for _ in range(args.spam)]
+    for user in range(1, args.users + 1):
+        for _ in range(args.per_user):
+            requests.append((random.uniform(0, args.spread), user, random.choice((CHEAP, EXPENSIVE))))
+    return sorted(requests)
+
+
+async def run(label, fake, burst, controller):
+    llm = CompletionService(api_key="fake", base_url=fake.base_url, max_retries=0)
+    outcomes = defaultdict(Counter)   # "spammer"/"regular" -> outcome counts
+    latencies = defaultdict(list)
+    started = time.perf_counter()
+
+    async def request(offset, user, priority):
+        await asyncio.sleep(offset)
+        t0 = time.perf_counter()
+        who = "spammer" if user == SPAMMER else "regular"
+        try:
+            if controller is None:
+                await llm.complete("Share some gossip.")
+            else:
+                async with controller.admit(user, GUILD, "bench", priority):
+                    await llm.complete("Share some gossip.")
+            outcomes[who]["answered"] += 1
+        except Rejected as e:
+            outcomes[who][e.reason] += 1
+        except Exception as e:
+            outcomes[who][type(e).__name__] += 1
+        latencies[who].append(time.perf_counter() - t0)
+
+    calls_before = fake.requests
+    await asyncio.gather(*(request(*r) for r in burst))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{label}: {fake.requests - calls_before} OpenAI calls in {elapsed:.1f}s")
+    for who in ("regular", "spammer"):
+        lat = latencies[who]
+        print(f"  {who:<8} p50 {percentile(lat, 0.5):5.2f}s  p95 {percentile(lat, 0.95):5.2f}s  "
+              f"max {max(lat):5.2f}s  {dict(outcomes[who])}")
+
+
+async def same_tick_handover(runs, max_wait=0.02):
+    # The slot frees up at exactly the moment the queued request's wait runs out. On 3.12+
+    # wait_for can then raise TimeoutError after _dispatch already handed the slot over.
+    loop = asyncio.get_running_loop()
+    leaked = 0
+    outcomes = Counter()
+    for _ in range(runs):
+        controller = AdmissionController(max_active=1, latency_budget=10.0)
+        holder = controller.admit(1, GUILD, "bench")
+        await holder.__aenter__()
+        loop.call_at(loop.time() + max_wait, controller._release)
+        try:
+            async with controller.admit(2, GUILD, "bench", max_wait=max_wait):
+                pass
+            outcomes["answered"] += 1
+        except Rejected as e:
+            outcomes[e.reason] += 1
+        await asyncio.sleep(0)
+        if controller.active or controller.depth:
+            leaked += 1
+    ok = not leaked
+    print(f"\nsame-tick handover: {'✅' if ok else '❌'} {leaked}/{runs} runs leaked a slot  {dict(outcomes)}")
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Simulate a burst with and without admission control.")
+    parser.add_argument("--users", type=int, default=12, help="regular users")
+    parser.add_argument("--per-user", type=int, default=2)
+    parser.add_argument("--spam", type=int, default=40, help="requests from the one spammer")
+    parser.add_argument("--spread", type=float, default=6.0, help="seconds over which regulars arrive")
+    parser.add_argument("--latency", type=float, default=0.8)
+    parser.add_argument("--max-active", type=int, default=4)
+    parser.add_argument("--budget", type=float, default=6.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--race-runs", type=int, default=500, help="same-tick handover attempts")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    burst = make_burst(args)
+    fake = FakeOpenAI(latency=args.latency, jitter=0.1, per_token=0.0)
+    await fake.start()
+    try:
+        await run("no admission control", fake, burst, None)
+        controller = AdmissionController(max_active=args.max_active, latency_budget=args.budget)
+        await run("admission control", fake, burst, controller)
+    finally:
+        await fake.stop()
+    return await same_tick_handover(args.race_runs)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
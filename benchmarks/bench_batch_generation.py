@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai import FakeOpenAI  # noqa: E402
+from llm import CompletionService  # noqa: E402
+
+# 🔹 One rumour per call vs BATCH rumours per call, against the fake endpoint.
+# The prompts mirror main.generate_rumour / main.generate_rumour_batch.
+RUMOUR_INSTRUCTIONS = (
+    "You are wise and slightly gruff. A customer has asked for a whispered rumour. "
+    "Based on the lore I give you, invent a rumour that sounds half-believable, dramatic, or eerie. "
+    "Make it short (1–2 sentences), and make sure it feels tied to Sordia Vignti's world."
+)
+TOPICS = ["strahd", "zargathax", "ellette", "qwimby", "graxen", "skab", "fizzle", "nora"]
+LORE = (
+    "Long ago the necromancer raised a tower of bone above the marsh, and the village below "
+    "learned to bar its doors at dusk. Travellers tell of lights in the high windows. "
+) * 12  # ~2000 characters, the same cap fetch_lore_from_index uses
+BATCH_LORE_CHARS = 600
+
+
+async def single(llm, n):
+    for i in range(n):
+        topic = TOPICS[i % len(TOPICS)]
+        await llm.complete(RUMOUR_INSTRUCTIONS, f"Lore about {topic}:\n{LORE}\n\nWhat’s the rumour?")
+    return n
+
+
+async def batched(llm, n, batch):
+    made = 0
+    while made < n:
+        count = min(batch, n - made)
+        topics = [TOPICS[(made + i) % len(TOPICS)] for i in range(count)]
+        notes = "\n\n".join(f"Lore about {t}:\n{LORE[:BATCH_LORE_CHARS]}" for t in dict.fromkeys(topics))
+        items = await llm.complete_items(
+            RUMOUR_INSTRUCTIONS,
+            f"{notes}\n\nWrite {count} different rumours, spread across these topics: {', '.join(dict.fromkeys(topics))}. "
+            "Put the topic name, exactly as written, in each item's \"topic\" field.",
+            count,
+            keys=("topic", "text"),
+        )
+        made += len(items)
+    return made
+
+
+async def run(label, fake, coro_fn):
+    llm = CompletionService(api_key="fake", base_url=fake.base_url)
+    started = time.perf_counter()
+    items = await coro_fn(llm)
+    elapsed = time.perf_counter() - started
+    usage = llm.usage
+    tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+    print(
+        f"{label:<10} items={items:<4} calls={usage['calls']:<4} "
+        f"tokens/item={tokens / items:>7.1f} (prompt {usage['prompt_tokens'] / items:.1f}) "
+        f"wall={elapsed:>6.2f}s  ({elapsed / items * 1000:.0f} ms/item)"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare single vs batched rumour generation.")
+    parser.add_argument("--items", type=int, default=24)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(latency=args.latency, jitter=0.0)
+    await fake.start()
+    try:
+        await run("single", fake, lambda llm: single(llm, args.items))
+        await run(f"batch={args.batch}", fake, lambda llm: batched(llm, args.items, args.batch))
+    finally:
+        await fake.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
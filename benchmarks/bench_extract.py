@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import extract  # noqa: E402
+from lore_store import clean_paragraphs  # noqa: E402
+
+# 🔹 HTML extraction on saved sample pages: the old bs4 html.parser +
+# get_text path against the shared extractor (lxml, and its bs4 fallback),
+# for pages/sec, what ends up in the lore store, and how much each way of
+# running it stalls an event loop that's trying to do other work.
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+URL = "https://sordiavignti.xyz/"
+
+# Per sample page: site chrome that shouldn't reach the lore store, and lore
+# sentences that should arrive whole, as one paragraph.
+EXPECTED = {
+    "npc_skab.html": {
+        "chrome": ["We use cookies", "homebrew campaign setting", "Built with love", "Privacy", "Session Notes"],
+        "intact": [
+            "every single item in it is genuinely magical.",
+            "The mule that came with it \"went to a better place, which was Kalteo\". Within a month",
+            "Qwimby considers him a rival; Skab considers Qwimby a customer.",
+        ],
+    },
+    "villains_hags.html": {
+        "chrome": ["Page last edited", "Von Zarovich", "schema.org", "Share Reddit"],
+        "intact": [
+            "she never says which afternoon she took.",
+            "The colour of his eyes, for a year and a day",
+            "keeps a sprig of rowan over the kitchen door just in case.",
+        ],
+    },
+}
+
+
+def old_parse(url, html):
+    # What crawler.parse_page did before the shared extractor.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find("title").text if soup.find("title") else url
+    text = soup.get_text(separator="\n").strip()
+    return title, text
+
+
+PATHS = {
+    "bs4 get_text (old)": lambda url, html: old_parse(url, html)[1],
+    "extract, bs4 fallback": lambda url, html: extract._extract_soup(url, html).text,
+    "extract, lxml": lambda url, html: extract._extract_lxml(url, html).text,
+}
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(PAGES_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def quality(pages):
+    print("\nOutput quality (what clean_paragraphs keeps for the lore store):")
+    print(f"  {'path':<24}{'paragraphs':>11}{'chrome':>8}{'intact':>8}{'split':>7}")
+    for label, parse in PATHS.items():
+        paragraphs = chrome = intact = split = 0
+        for name, html in pages.items():
+            kept = clean_paragraphs(parse(URL + name, html))
+            paragraphs += len(kept)
+            expected = EXPECTED.get(name, {})
+            chrome += sum(any(marker in p for p in kept) for marker in expected.get("chrome", ()))
+            for sentence in expected.get("intact", ()):
+                if any(sentence.lower() in p.lower() for p in kept):
+                    intact += 1
+                else:
+                    split += 1
+        print(f"  {label:<24}{paragraphs:>11}{chrome:>8}{intact:>8}{split:>7}")
+
+
+def throughput(pages, repeat):
+    work = list(pages.items()) * repeat
+    print(f"\nThroughput, in process ({len(work)} pages, {sum(len(h) for _, h in work) / 1024:.0f} KiB):")
+    for label, parse in PATHS.items():
+        started = time.perf_counter()
+        for name, html in work:
+            parse(URL + name, html)
+        elapsed = time.perf_counter() - started
+        print(f"  {label:<24}{len(work) / elapsed:>8.0f} pages/sec")
+
+
+async def loop_lag(pages, repeat, workers):
+    # How long a 5ms ticker on the loop gets held up while a crawl's worth of pages is parsed.
+    work = list(pages.items()) * repeat
+
+    async def measure(label, run):
+        worst = 0.0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal worst
+            while not done.is_set():
+                before = time.perf_counter()
+                await asyncio.sleep(0.005)
+                worst = max(worst, time.perf_counter() - before - 0.005)
+
+        tick = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - started
+        done.set()
+        await tick
+        print(f"  {label:<24}{len(work) / elapsed:>8.0f} pages/sec   worst loop stall {worst * 1000:7.1f} ms")
+
+    async def on_loop():
+        for name, html in work:
+            old_parse(URL + name, html)
+            await asyncio.sleep(0)
+
+    async def in_threads():
+        sem = asyncio.Semaphore(8)
+
+        async def one(name, html):
+            async with sem:
+                await asyncio.to_thread(old_parse, URL + name, html)
+        await asyncio.gather(*(one(name, html) for name, html in work))
+
+    async def in_pool():
+        sem = asyncio.Semaphore(8)
+
+        async def one(name, html):
+            async with sem:
+                await extract.extract_async(URL + name, html)
+        await asyncio.gather(*(one(name, html) for name, html in work))
+
+    print(f"\nEvent loop stalls while parsing ({len(work)} pages, {workers} pool worker(s)):")
+    await measure("old, on the loop", on_loop)
+    await measure("old, to_thread", in_threads)
+    await extract.extract_async(URL, "<p>warm up</p>")  # fork the workers outside the measurement
+    await measure("extract, process pool", in_pool)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML extraction paths on saved sample pages.")
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the sample pages")
+    parser.add_argument("--workers", type=int, default=extract.EXTRACT_WORKERS)
+    parser.add_argument("--show", action="store_true", help="print each path's output for the first page")
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if not pages:
+        sys.exit(f"No sample pages in {PAGES_DIR}")
+    if args.show:
+        name, html = next(iter(pages.items()))
+        for label, parse in PATHS.items():
+            print(f"----- {label}: {name}\n{parse(URL + name, html)}\n")
+
+    quality(pages)
+    throughput(pages, args.repeat)
+    extract.EXTRACT_WORKERS = args.workers
+    try:
+        asyncio.run(loop_lag(pages, args.repeat, args.workers))
+    finally:
+        extract.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
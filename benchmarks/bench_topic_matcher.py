@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from topic_matcher import TopicMatcher  # noqa: E402
+
+# 🔹 Old first-word scan vs the compiled topic matcher, on typical prompts.
+PROMPTS = [
+    "who is strahd",
+    "tell me about zargathax",
+    "What do you know about Steve Emberfoot and his brother?",
+    "Is it true Zargathax's tower is haunted, and what does Strahd von Zarovich think of it?",
+    "Have you heard anything about the hags, or Nora and Pearl in particular?",
+    "Pour me an ale and tell me a story about the old days before the war",
+    "Graxen Varrow owes me money, where can I find him? Maybe ask Ellette or Qwimby.",
+]
+NUMBER = 20000
+
+
+def old_scan(prompt, lore_index):
+    return next((word for word in prompt.lower().split() if word in lore_index), "")
+
+
+def main():
+    with open(os.path.join(ROOT, "lore_index.json"), "r") as f:
+        lore_index = json.load(f)
+    with open(os.path.join(ROOT, "lore_aliases.json"), "r") as f:
+        aliases = json.load(f)
+
+    build = timeit.timeit(lambda: TopicMatcher.from_index(lore_index, aliases), number=100) / 100
+    matcher = TopicMatcher.from_index(lore_index, aliases)
+
+    print(f"matcher build: {build * 1e3:.3f} ms\n")
+    print(f"{'prompt':<60} {'scan µs':>8} {'trie µs':>8}  scan -> trie")
+    for prompt in PROMPTS:
+        scan = timeit.timeit(lambda: old_scan(prompt, lore_index), number=NUMBER) / NUMBER
+        trie = timeit.timeit(lambda: matcher.find(prompt), number=NUMBER) / NUMBER
+        label = prompt if len(prompt) <= 57 else prompt[:57] + "..."
+        print(
+            f"{label:<60} {scan * 1e6:>8.2f} {trie * 1e6:>8.2f}  "
+            f"{old_scan(prompt, lore_index) or '-'} -> {', '.join(matcher.find(prompt)) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
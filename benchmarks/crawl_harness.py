@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from collections import Counter
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import crawler  # noqa: E402
+from extract import shutdown_pool  # noqa: E402
+
+# 🔹 Runs the real crawler against a small local site and checks that every
+# page is fetched once, a re-crawl gets 304s instead of bodies, an
+# interrupted crawl resumes without refetching what it finished, and
+# neither an error page nor a page the parser chokes on stops the crawl.
+XHTML_PAGE = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">\n'
+    '<html xmlns="http://www.w3.org/1999/xhtml"><head><title>Ledger</title></head>'
+    '<body><main><h1>Ledger</h1><p>Big Tony owes the Lucky Griffon eleven silver.</p>'
+    '<a href="/">Home</a></main></body></html>'
+)
+
+
+class LocalSite:
+    def __init__(self, pages: int, delay: float):
+        self.delay = delay
+        self.requests = Counter()   # path -> requests
+        self.bodies = Counter()     # path -> 200 responses with a body
+        self.not_modified = Counter()
+        self.paths = [f"/lore/page-{i}" for i in range(pages)]
+        self._runner = None
+        self.base_url = None
+
+    def render(self, path: str) -> str:
+        if path == "/xhtml":
+            return XHTML_PAGE
+        if path == "/":
+            links = self.paths[:3] + ["/xhtml", "/broken", "/error", "/missing"]
+        elif path == "/broken":
+            links = ["/"]
+        else:
+            i = self.paths.index(path)
+            links = self.paths[i + 1:i + 4] + ["/"]
+        anchors = "".join(f'<li><a href="{link}">{link}</a></li>' for link in links)
+        return (
+            f"<!DOCTYPE html><html><head><title>{path}</title></head><body>"
+            f"<main><h1>{path}</h1><p>Lore for {path}, written down by Quintin.</p><ul>{anchors}</ul></main>"
+            "</body></html>"
+        )
+
+    async def handle(self, request):
+        path = request.path.rstrip("/") or "/"
+        self.requests[path] += 1
+        await asyncio.sleep(self.delay)
+        if path == "/error":
+            return web.Response(status=500, text="The cellar flooded.")
+        if path not in ("/", "/xhtml", "/broken") and path not in self.paths:
+            return web.Response(status=404, text="Not found")
+        html = self.render(path)
+        etag = '"' + hashlib.sha1(html.encode()).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified[path] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        self.bodies[path] += 1
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def install_broken_parser():
+    # A page whose extraction raises: not a network error, so it's the worker's catch-all that has to handle it.
+    extract_async = crawler.extract_async
+
+    async def choking(url, html):
+        if url.endswith("/broken"):
+            raise ValueError("parser choked on /broken")
+        return await extract_async(url, html)
+
+    crawler.extract_async = choking
+
+
+async def crawl(site, state_file, timeout):
+    c = crawler.Crawler(site.base_url, state_file, concurrency=4)
+    try:
+        stats = await asyncio.wait_for(c.run(), timeout)
+    except asyncio.TimeoutError:
+        raise SystemExit(f"❌ crawl hung: nothing back after {timeout:.0f}s, a worker probably died") from None
+    return c, stats
+
+
+async def interrupted_crawl(site, state_file, after_pages):
+    c = crawler.Crawler(site.base_url, state_file, concurrency=2)
+    task = asyncio.create_task(c.run())
+    while c.stats["pages"] < after_pages and not task.done():
+        await asyncio.sleep(0.005)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return c
+
+
+async def run(args) -> dict:
+    install_broken_parser()
+    tmp = tempfile.mkdtemp(prefix="quintin-crawl-")
+    site = LocalSite(args.pages, args.delay)
+    await site.start()
+    good_paths = ["/", "/xhtml"] + site.paths
+    good = {site.base_url.rstrip("/") + p for p in good_paths}
+    try:
+        state = os.path.join(tmp, "full.json")
+        first, stats = await crawl(site, state, args.timeout)
+        first_requests = Counter(site.requests)
+        site.requests.clear()
+        site.bodies.clear()
+        _, restats = await crawl(site, state, args.timeout)
+        recrawl_bodies = Counter(site.bodies)
+        xhtml = first.pages.get(site.base_url + "xhtml", {}).get("text", "")
+
+        site.requests.clear()
+        site.bodies.clear()
+        state = os.path.join(tmp, "resume.json")
+        stopped = await interrupted_crawl(site, state, args.pages // 3)
+        finished_before = {url for url in stopped.pages}
+        fetched_before = Counter(site.bodies)
+        resumed, _ = await crawl(site, state, args.timeout)
+        refetched = [
+            path for path, n in site.bodies.items()
+            if n > fetched_before[path] and site.base_url.rstrip("/") + path in finished_before
+        ]
+
+        checks = {
+            "crawl_finished_despite_bad_pages": stats["errors"] == 3,  # /broken, /error, /missing
+            "every_page_fetched_once": all(n == 1 for n in first_requests.values()),
+            "every_good_page_stored": set(first.pages) == good,
+            "xhtml_page_parsed": "Big Tony owes" in xhtml,
+            "recrawl_got_304s": set(site.not_modified) == set(good_paths) and not any(recrawl_bodies[p] for p in good_paths),
+            "recrawl_counted_unchanged": restats["unchanged"] == len(good),
+            "interrupted_before_the_end": 0 < len(finished_before) < len(good),
+            "resume_kept_finished_pages": not refetched,
+            "resume_completed_the_crawl": set(resumed.pages) == good,
+            "state_marked_finished": '"run"' not in open(state).read(),
+        }
+        return {
+            "pages": len(good),
+            "first": stats,
+            "recrawl": restats,
+            "finished_before_interrupt": len(finished_before),
+            "checks": checks,
+        }
+    finally:
+        await site.stop()
+        shutdown_pool()
+
+
+def report(result: dict) -> bool:
+    first, again = result["first"], result["recrawl"]
+    print(f"{result['pages']} pages: first crawl {first['seconds']}s ({first['fetched']} fetched, {first['errors']} errors), "
+          f"re-crawl {again['seconds']}s ({again['unchanged']} unchanged), "
+          f"interrupted after {result['finished_before_interrupt']} and resumed")
+    for name, ok in result["checks"].items():
+        print(f"  {'✅' if ok else '❌'} {name}")
+    return all(result["checks"].values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the crawler against a local stand-in site.")
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.01, help="seconds each response takes")
+    parser.add_argument("--timeout", type=float, default=30.0, help="a crawl that takes longer has hung")
+    args = parser.parse_args()
+    sys.exit(0 if report(asyncio.run(run(args))) else 1)
@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import json
+import time
+
+import discord
+import yarl
+from aiohttp import WSMsgType, web
+
+# 🔹 A local stand-in for Discord's REST API and gateway: enough for a real
+# discord.py (Auto)ShardedBot to log in, IDENTIFY each shard, receive its
+# guilds and send messages, so sharding can be checked without a token.
+BOT_ID = 1100000000000000001
+DISCORD_EPOCH_MS = 1420070400000
+GUILD_BASE_MS = 283996800000  # 2024-01-01, relative to the Discord epoch
+HEARTBEAT_INTERVAL = 41250  # ms, the same as Discord's
+
+_snowflakes = itertools.count(1)
+
+
+def snowflake() -> int:
+    ms = int(time.time() * 1000) - DISCORD_EPOCH_MS
+    return (ms << 22) | next(_snowflakes) % 4096
+
+
+def make_guilds(count: int, channels_per_guild=2) -> list:
+    # Consecutive ids spread evenly over shards, since shard = (id >> 22) % shard_count.
+    # The base is fixed so separate processes agree on the same guilds.
+    base = GUILD_BASE_MS
+    guilds = []
+    for i in range(count):
+        guild_id = ((base + i) << 22) | i
+        channel_ids = [((base + i) << 22) | (1000 + i * channels_per_guild + c) for c in range(channels_per_guild)]
+        guilds.append({"id": guild_id, "name": f"Tavern {i}", "channels": channel_ids})
+    return guilds
+
+
+def _json(data) -> web.Response:
+    # discord.py only parses bodies whose content type is exactly application/json.
+    return web.Response(body=json.dumps(data).encode(), headers={"Content-Type": "application/json"})
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+class FakeDiscord:
+    def __init__(self, guilds: list, shard_count: int):
+        self.guilds = guilds
+        self.shard_count = shard_count
+        self.identified = []     # (shard_id, shard_count) per IDENTIFY
+        self.messages = []       # (channel_id, content) per message sent
+        self.command_syncs = []  # (guild_id or None, number of commands) per bulk overwrite
+        self.base_url = None
+        self._runner = None
+
+    def _user(self):
+        return {"id": str(BOT_ID), "username": "Quintin", "discriminator": "0", "global_name": None,
+                "avatar": None, "bot": True}
+
+    def _guild_payload(self, guild):
+        channels = [
+            {"id": str(c), "type": 0, "name": f"tavern-{n}", "position": n, "permission_overwrites": []}
+            for n, c in enumerate(guild["channels"])
+        ]
+        everyone = {"id": str(guild["id"]), "name": "@everyone", "permissions": "0", "position": 0,
+                    "color": 0, "hoist": False, "managed": False, "mentionable": False}
+        return {
+            "id": str(guild["id"]), "name": guild["name"], "icon": None, "owner_id": str(BOT_ID),
+            "roles": [everyone], "channels": channels, "members": [], "member_count": 1,
+            "features": [], "emojis": [], "stickers": [], "threads": [], "stage_instances": [],
+            "guild_scheduled_events": [], "voice_states": [], "presences": [], "unavailable": False,
+            "large": False, "verification_level": 0, "default_message_notifications": 0,
+            "explicit_content_filter": 0, "mfa_level": 0, "premium_tier": 0, "nsfw_level": 0,
+            "preferred_locale": "en-US", "system_channel_flags": 0,
+        }
+
+    # REST
+    async def users_me(self, request):
+        return _json(self._user())
+
+    async def application(self, request):
+        return _json({
+            "id": str(BOT_ID), "name": "Quintin", "description": "", "icon": None, "bot_public": True,
+            "bot_require_code_grant": False, "owner": self._user(), "verify_key": "0", "flags": 0,
+        })
+
+    async def gateway_bot(self, request):
+        return _json({
+            "url": self.gateway_url, "shards": self.shard_count,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def bulk_commands(self, request):
+        body = await request.json()
+        guild_id = request.match_info.get("guild_id")
+        self.command_syncs.append((int(guild_id) if guild_id else None, len(body)))
+        return _json([
+            {**cmd, "id": str(snowflake()), "application_id": str(BOT_ID), "version": "1"} for cmd in body
+        ])
+
+    async def create_message(self, request):
+        body = await request.json()
+        channel_id = int(request.match_info["channel_id"])
+        self.messages.append((channel_id, body.get("content")))
+        return _json({
+            "id": str(snowflake()), "channel_id": str(channel_id), "content": body.get("content") or "",
+            "author": self._user(), "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": [], "pinned": False, "type": 0,
+        })
+
+    # Gateway
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        seq = itertools.count(1)
+
+        async def dispatch(event, data):
+            await ws.send_str(json.dumps({"op": 0, "t": event, "s": next(seq), "d": data}))
+
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL}}))
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            payload = json.loads(msg.data)
+            if payload["op"] == 1:
+                await ws.send_str(json.dumps({"op": 11}))
+            elif payload["op"] == 2:
+                shard_id, shard_count = payload["d"].get("shard", [0, 1])
+                self.identified.append((shard_id, shard_count))
+                mine = [g for g in self.guilds if shard_for(g["id"], shard_count) == shard_id]
+                await dispatch("READY", {
+                    "v": 10, "user": self._user(), "session_id": f"session-{shard_id}",
+                    "resume_gateway_url": self.gateway_url, "shard": [shard_id, shard_count],
+                    "guilds": [{"id": str(g["id"]), "unavailable": True} for g in mine],
+                    "application": {"id": str(BOT_ID), "flags": 0},
+                })
+                for guild in mine:
+                    await dispatch("GUILD_CREATE", self._guild_payload(guild))
+        return ws
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self.users_me)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self.application)
+        app.router.add_get("/api/v10/gateway/bot", self.gateway_bot)
+        app.router.add_put("/api/v10/applications/{app_id}/commands", self.bulk_commands)
+        app.router.add_put("/api/v10/applications/{app_id}/guilds/{guild_id}/commands", self.bulk_commands)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self.create_message)
+        app.router.add_get("/gateway", self.gateway)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}/api/v10"
+        self.gateway_url = f"ws://{host}:{port}/gateway"
+        return self.base_url
+
+    def install(self):
+        # Point discord.py at this server instead of discord.com.
+        discord.http.Route.BASE = self.base_url
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(self.gateway_url)
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def wait_for(predicate, timeout=30.0, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not met in time")
+        await asyncio.sleep(interval)
@@ -0,0 +1,92 @@
+import time
+
+# 🔹 Just enough of discord.Interaction to call the bot's registered slash
+# commands directly, with no gateway or REST API in between. Every
+# acknowledgement, message and edit is timestamped, so a driver can tell
+# how long a user waited for the first sign of life and for the full reply.
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+
+
+class FakeMessage:
+    def __init__(self, interaction, content):
+        self.interaction = interaction
+        self.content = content
+        self.attachments = []
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+        self.interaction._touch()
+        return self
+
+    async def delete(self, **kwargs):
+        self.interaction.messages.remove(self)
+        self.interaction._touch()
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+        self.interaction._touch(ack=True)
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.messages.append(FakeMessage(self.interaction, content))
+        self.interaction._touch(ack=True)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, *, wait=False, **kwargs):
+        message = FakeMessage(self.interaction, content)
+        self.interaction.messages.append(message)
+        self.interaction._touch()
+        return message
+
+
+class FakeInteraction:
+    def __init__(self, command, user: FakeUser, guild_id: int, channel_id: int):
+        self.command = command
+        self.user = user
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.messages = []
+        self.started = time.perf_counter()
+        self.acked = None    # seconds until defer() or the first direct reply
+        self.finished = None  # seconds until the last message or edit
+
+    def _touch(self, ack=False):
+        elapsed = time.perf_counter() - self.started
+        if ack and self.acked is None:
+            self.acked = elapsed
+        self.finished = elapsed
+
+    @property
+    def reply(self) -> str:
+        return "\n".join(m.content or "" for m in self.messages)
+
+
+async def invoke(tree, command_name: str, caller: FakeUser, guild_id: int, channel_id: int, options=None) -> FakeInteraction:
+    # Runs the command's callback the way discord.py would after parsing the options.
+    command = tree.get_command(command_name)
+    interaction = FakeInteraction(command, caller, guild_id, channel_id)
+    interaction.started = time.perf_counter()
+    await command.callback(interaction, **(options or {}))
+    return interaction
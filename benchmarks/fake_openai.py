@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from aiohttp import web
+
+# 🔹 A local stand-in for the OpenAI chat completions endpoint, with tunable
+# latency and error rates, so benchmarks never need a key or the network.
+COUNT_RE = re.compile(r"exactly (\d+) objects")
+TOPICS_RE = re.compile(r"topics: ([^.\n]+)\.")
+LINES = [
+    "They say the cellar door at the Lucky Griffon hums on moonless nights.",
+    "A hooded stranger paid for a round in coins nobody could identify.",
+    "Someone swears the stew moved on its own last Tuesday.",
+    "Word is a map was found sewn into the lining of an old cloak.",
+    "The blacksmith's apprentice hasn't been seen since the fog rolled in.",
+]
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class FakeOpenAI:
+    def __init__(self, latency=0.3, jitter=0.1, per_token=0.004, error_rate=0.0, slow_rate=0.0, slow_latency=5.0):
+        self.latency = latency          # seconds before the first token
+        self.jitter = jitter            # +/- uniform noise on latency
+        self.per_token = per_token      # seconds per generated token
+        self.error_rate = error_rate    # fraction of requests answered with a 500/429
+        self.slow_rate = slow_rate      # fraction of requests that stall for slow_latency
+        self.slow_latency = slow_latency
+        self.requests = 0
+        self._runner = None
+        self.base_url = None
+
+    def _content(self, body):
+        text = "\n".join(m.get("content", "") for m in body["messages"])
+        count = COUNT_RE.search(text)
+        if not count:
+            return random.choice(LINES)
+        topics = TOPICS_RE.search(text)
+        topics = [t.strip() for t in topics.group(1).split(",")] if topics else []
+        items = []
+        for i in range(int(count.group(1))):
+            item = {"text": random.choice(LINES)}
+            if '"topic"' in text:
+                item["topic"] = topics[i % len(topics)] if topics else "tavern"
+            items.append(item)
+        return json.dumps(items)
+
+    async def _delay(self, tokens):
+        latency = self.latency + random.uniform(-self.jitter, self.jitter)
+        if random.random() < self.slow_rate:
+            latency = self.slow_latency
+        await asyncio.sleep(max(0.0, latency) + tokens * self.per_token)
+
+    async def chat_completions(self, request):
+        self.requests += 1
+        body = await request.json()
+        if random.random() < self.error_rate:
+            status = random.choice((429, 500))
+            return web.json_response({"error": {"message": "fake failure", "type": "server_error"}}, status=status)
+
+        content = self._content(body)
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in body["messages"])
+        completion_tokens = estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        base = {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+        }
+        if body.get("stream"):
+            return await self._stream(request, base, content, usage)
+
+        await self._delay(completion_tokens)
+        return web.json_response({
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": usage,
+        })
+
+    async def _stream(self, request, base, content, usage):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await self._delay(0)
+
+        async def event(choices, usage=None):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": choices, "usage": usage}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == 0 else " " + word
+            await event([{"index": 0, "delta": {"content": delta}, "finish_reason": None}])
+            await asyncio.sleep(estimate_tokens(delta) * self.per_token)
+        await event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        await event([], usage)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}/v1"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def serve(args):
+    fake = FakeOpenAI(args.latency, args.jitter, args.per_token, args.error_rate)
+    print(f"Fake OpenAI listening on {await fake.start(port=args.port)}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI chat completions server.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--per-token", type=float, default=0.004)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,124 @@
+import hashlib
+import random
+from html import escape
+from urllib.parse import quote, unquote_plus, urlparse
+
+from aiohttp import web
+
+# 🔹 A local copy of sordiavignti.xyz for benchmarks: one page per lore index
+# URL plus optional filler pages, laid out like the real wiki with nav, sidebar and footer, and serving ETags so
+# the crawler's incremental refresh can be exercised. edit() changes some
+# pages, the way the DM updating the wiki would.
+SECTIONS = ["Appearance", "History", "Relationships", "Rumours", "Notes"]
+PLACES = ["Alexandria", "Kalteo", "the Mallow Fen", "the Moonwood", "the Keep", "the Lucky Griffon"]
+PEOPLE = ["Quintin", "Big Tony", "Ellette", "Graxen", "Qwimby", "Skab", "Zargathax", "Nora"]
+SENTENCES = [
+    "{name} was last seen near {place}, arguing with {person} about a debt neither would name.",
+    "Some say {name} once crossed {place} in a single night, though {person} tells it differently.",
+    "{person} swears {name} still owes the Lucky Griffon for a round of mulled cider from three winters ago.",
+    "Travellers from {place} describe {name} as quiet, watchful and far too interested in old maps.",
+    "When the fog rolled over {place}, {name} was the only one who didn't seem surprised.",
+    "{name} keeps a small iron key on a cord, and has never explained what it opens.",
+    "Few in {place} will say the name {name} aloud after dark, and {person} won't say it at all.",
+    "{name} has a standing arrangement with {person} that nobody else in {place} understands.",
+]
+
+
+def page_path(url: str) -> str:
+    # The key a URL is served under: unquoted, no trailing slash, like canonical_url.
+    return unquote_plus(urlparse(url).path).rstrip("/") or "/"
+
+
+def href(path: str) -> str:
+    return quote(path.replace(" ", "+"), safe="/+()'")
+
+
+class FakeSite:
+    def __init__(self, topics: dict, extra_pages=0, seed=7):
+        self.seed = seed
+        self.pages = {}      # path -> (title, version)
+        self.requests = 0
+        self.not_modified = 0
+        self.base_url = None
+        self._runner = None
+        for url in topics.values():
+            path = page_path(url)
+            self.pages[path] = (path.rsplit("/", 1)[-1], 0)
+        for i in range(extra_pages):
+            self.pages[f"/Archive/Old Notes {i}"] = (f"Old Notes {i}", 0)
+        for path in ("/privacy", "/about"):
+            self.pages[path] = (path.strip("/").title(), 0)
+
+    def local_url(self, url: str) -> str:
+        return self.base_url.rstrip("/") + href(page_path(url))
+
+    def edit(self, fraction: float) -> int:
+        # Bump a share of the pages to a new version; returns how many changed.
+        rng = random.Random(self.seed + len(self.pages))
+        changed = rng.sample(sorted(self.pages), max(1, int(len(self.pages) * fraction)))
+        for path in changed:
+            title, version = self.pages[path]
+            self.pages[path] = (title, version + 1)
+        return len(changed)
+
+    def _sidebar(self, rng) -> str:
+        links = rng.sample(sorted(self.pages), min(12, len(self.pages)))
+        items = "".join(f'<li><a href="{href(p)}">{escape(self.pages[p][0])}</a></li>' for p in links)
+        return f'<aside class="sidebar"><div class="sidebar-title">Explore</div><ul>{items}</ul></aside>'
+
+    def _content(self, title, rng) -> str:
+        parts = [f"<h1>{escape(title)}</h1>"]
+        for section in rng.sample(SECTIONS, rng.randint(2, 4)):
+            parts.append(f"<h2>{section}</h2>")
+            for _ in range(rng.randint(1, 3)):
+                sentences = [
+                    s.format(name=escape(title), place=rng.choice(PLACES), person=rng.choice(PEOPLE))
+                    for s in rng.sample(SENTENCES, rng.randint(2, 4))
+                ]
+                parts.append(f"<p>{' '.join(sentences)}</p>")
+        return "\n".join(parts)
+
+    def render(self, path: str) -> str:
+        title, version = self.pages.get(path, ("Home", 0))
+        rng = random.Random(f"{self.seed}:{path}:{version}")
+        if path == "/":
+            links = "".join(f'<li><a href="{href(p)}">{escape(t)}</a></li>' for p, (t, _) in sorted(self.pages.items()))
+            body = f"<h1>Sordia Vignti</h1><p>Welcome to the wiki.</p><ul>{links}</ul>"
+        else:
+            body = self._content(title, rng)
+        return (
+            f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{escape(title)} - Sordia Vignti</title>"
+            "<script>window.dataLayer = [];</script><style>.sidebar { width: 240px; }</style></head><body>"
+            '<header class="site-header"><a class="logo" href="/">Sordia Vignti</a>'
+            '<nav><a href="/">Home</a> <a href="/about">About</a></nav></header>'
+            f'<div class="layout">{self._sidebar(rng)}<main id="content">{body}</main></div>'
+            '<footer class="site-footer"><a href="/privacy">Privacy</a></footer>'
+            "</body></html>"
+        )
+
+    async def handle(self, request):
+        self.requests += 1
+        path = unquote_plus(request.raw_path.split("?", 1)[0]).rstrip("/") or "/"
+        if path != "/" and path not in self.pages:
+            return web.Response(status=404, text="Not found")
+        html = self.render(path)
+        etag = '"' + hashlib.sha1(html.encode()).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}/"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
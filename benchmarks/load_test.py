@@ -0,0 +1,428 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_interaction import FakeUser, invoke  # noqa: E402
+from benchmarks.fake_openai import FakeOpenAI  # noqa: E402
+from benchmarks.fake_site import FakeSite  # noqa: E402
+
+# 🔹 Offline load test: the real command handlers from main.py, driven through
+# fake Interactions, with OpenAI and sordiavignti.xyz replaced by local
+# servers. Scenarios run in order against one bot:
+#   cold           - a burst with no lore store and empty caches and pools
+#   crawl          - a full crawl, then a re-crawl with nothing changed
+#   warm           - the same burst with the store compiled and pools stocked
+#   refresh        - a burst while a crawl of an edited site runs and is hot-loaded
+#   outage         - a burst with OpenAI failing every call
+# Each reports throughput, latency, event-loop lag and peak RSS. --save
+# records a baseline; later runs are compared against it. Timing noise (which
+# call draws an OpenAI stall, say) moves a single run's p95 by seconds, so
+# the suite runs --runs times in fresh processes and every metric is the median.
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "load_test.json")
+TOLERANCE = 0.25       # allowed relative change before a metric counts as a regression
+NOISE_FLOOR = {"latency_p95_s": 0.25, "loop_lag_p99_ms": 10.0, "peak_rss_mib": 10.0, "seconds": 0.5}
+PROBE_INTERVAL = 0.01  # seconds between event-loop lag / memory samples
+
+COMMAND_MIX = {
+    "askquintin": 30, "who": 15, "rumour": 10, "gossip": 10,
+    "investigate": 10, "menu": 10, "compliment": 8, "insult": 7,
+}
+PROMPTS = [
+    "What do you know about {topic}?",
+    "Has {topic} been in lately?",
+    "Tell me a story about {topic}.",
+    "Is it true what they say about {topic}?",
+]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource  # not Linux: the lifetime peak is the best we can do
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Probe:
+    # Samples event-loop lag and resident memory while a scenario runs.
+    def __init__(self, interval=PROBE_INTERVAL):
+        self.interval = interval
+        self.lags = []
+        self.peak_rss = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - before - self.interval))
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+
+    def __enter__(self):
+        self.peak_rss = rss_bytes()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def report(self) -> dict:
+        return {
+            "loop_lag_p99_ms": round(percentile(self.lags, 0.99) * 1000, 1),
+            "loop_lag_max_ms": round(max(self.lags, default=0.0) * 1000, 1),
+            "peak_rss_mib": round(self.peak_rss / 2 ** 20, 1),
+        }
+
+
+def make_burst(args, topics: list, menu_items: list) -> list:
+    # (start offset, command, user, guild id, channel id, options), the same for every run with one seed.
+    rng = random.Random(args.seed)
+    names, weights = zip(*COMMAND_MIX.items())
+    burst = []
+    for n in range(args.users):
+        guild_id = 1000 + n % args.guilds
+        user = FakeUser(10_000 + n, f"Adventurer{n}")
+        for _ in range(args.per_user):
+            command = rng.choices(names, weights)[0]
+            topic = rng.choice(topics)
+            options = {
+                "askquintin": lambda: {"prompt": rng.choice(PROMPTS).format(topic=topic.title())},
+                "who": lambda: {"name": topic},
+                "investigate": lambda: {"topic": topic},
+                "menu": lambda: {"item": rng.choice(menu_items)},
+                "compliment": lambda: {"user": FakeUser(20_000 + n, f"Friend{n}")},
+                "insult": lambda: {"user": FakeUser(20_000 + n, f"Friend{n}")},
+            }.get(command, dict)()
+            burst.append((rng.uniform(0, args.spread), command, user, guild_id, guild_id * 10, options))
+    return sorted(burst, key=lambda request: request[0])
+
+
+async def run_burst(main, fake_openai, burst) -> dict:
+    from metrics import metrics
+
+    turned_away = tuple(main.TURNED_AWAY.values())
+    latencies = defaultdict(list)
+    acks = []
+    outcomes = Counter()
+    for channel_id in {request[4] for request in burst}:
+        main.conversations.forget(channel_id)  # every run starts the same conversations from scratch
+
+    async def one(offset, command, user, guild_id, channel_id, options):
+        await asyncio.sleep(offset)
+        try:
+            interaction = await invoke(main.bot.tree, command, user, guild_id, channel_id, options)
+        except Exception as e:
+            outcomes[f"raised {type(e).__name__}"] += 1
+            return
+        reply = interaction.reply
+        if any(line in reply for line in turned_away):
+            outcomes["turned_away"] += 1
+        elif reply.startswith("❌") or not reply:
+            outcomes["error"] += 1
+        else:
+            outcomes["answered"] += 1
+        latencies[command].append(interaction.finished or 0.0)
+        acks.append(interaction.acked or 0.0)
+
+    calls_before = fake_openai.requests
+    fallbacks_before = metrics.total("quintin_llm_fallback_total")
+    with Probe() as probe:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*request) for request in burst))
+        elapsed = time.perf_counter() - started
+
+    everything = [s for samples in latencies.values() for s in samples]
+    return {
+        "commands": len(burst),
+        "seconds": round(elapsed, 2),
+        "throughput_per_s": round(len(burst) / elapsed, 1),
+        "latency_p50_s": round(percentile(everything, 0.5), 3),
+        "latency_p95_s": round(percentile(everything, 0.95), 3),
+        "latency_p99_s": round(percentile(everything, 0.99), 3),
+        "latency_max_s": round(max(everything, default=0.0), 3),
+        "ack_p95_s": round(percentile(acks, 0.95), 3),
+        "p95_by_command_s": {name: round(percentile(s, 0.95), 3) for name, s in sorted(latencies.items())},
+        "outcomes": dict(outcomes),
+        "openai_calls": fake_openai.requests - calls_before,
+        "fallbacks": int(metrics.total("quintin_llm_fallback_total") - fallbacks_before),
+        **probe.report(),
+    }
+
+
+async def crawl(site_url: str, workdir: str) -> dict:
+    # The crawler runs as its own process, the way it does in production.
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "crawler.py"), site_url,
+        "--state", "crawl_state.json", "--output", "master_lore.txt", "--store", "lore.db", "--index", "lore_index.json",
+        cwd=workdir, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+    )
+    output, _ = await process.communicate()
+    lines = output.decode(errors="replace").strip().splitlines()
+    if process.returncode != 0:
+        raise RuntimeError("crawl failed:\n" + "\n".join(lines[-20:]))
+    return {"seconds": round(time.perf_counter() - started, 2), "summary": lines[-1] if lines else ""}
+
+
+async def stock_pools(main):
+    # What the scheduler's refill job would have done over a quiet spell.
+    while await main.content_pools.refill(budget=10):
+        pass
+
+
+async def scenarios(args, workdir, fake_openai, site) -> dict:
+    import extract
+    import main
+    from lore_client import lore_client
+
+    topics = sorted(main.lore_watcher.current.topics)
+    burst = make_burst(args, topics, [*main.FOOD_MENU, *main.DRINK_MENU, "secret"])
+    results = {}
+
+    async def reload_lore():
+        await main.watch_lore()
+        if main.lore_store.current_version() is None:
+            raise RuntimeError("no lore store after the crawl")
+
+    try:
+        print(f"🍺 {len(burst)} commands from {args.users} users in {args.guilds} guilds over {args.spread}s")
+        results["cold"] = await run_burst(main, fake_openai, burst)
+
+        full = await crawl(site.base_url, workdir)
+        await reload_lore()
+        unchanged = await crawl(site.base_url, workdir)
+        results["crawl"] = {
+            "seconds": full["seconds"], "recrawl_unchanged_seconds": unchanged["seconds"],
+            "pages": len(site.pages) + 1, "summary": full["summary"],
+        }
+
+        await stock_pools(main)
+        results["warm"] = await run_burst(main, fake_openai, burst)
+
+        # A crawl of the edited site lands mid-burst; watch_lore picks it up like the scheduled job would.
+        edited = site.edit(args.edit_fraction)
+        stop = asyncio.Event()
+
+        async def watch():
+            while not stop.is_set():
+                await main.watch_lore()
+                await asyncio.sleep(1)
+
+        watcher = asyncio.create_task(watch())
+        crawl_task = asyncio.create_task(crawl(site.base_url, workdir))
+        results["refresh"] = await run_burst(main, fake_openai, burst)
+        refreshed = await crawl_task
+        stop.set()
+        await watcher
+        results["refresh"].update(crawl_seconds=refreshed["seconds"], pages_edited=edited)
+
+        fake_openai.error_rate = 1.0
+        results["outage"] = await run_burst(main, fake_openai, burst)
+        fake_openai.error_rate = args.error_rate
+    finally:
+        await lore_client.close()
+        extract.shutdown_pool()
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list:
+    # (scenario, metric, before, after) for every metric that got worse by more than TOLERANCE.
+    # Lag is compared at p99: the max is one stall, and a single slow import moves it a lot.
+    worse_when_higher = ["latency_p95_s", "loop_lag_p99_ms", "peak_rss_mib", "seconds"]
+    regressions = []
+    for scenario, now in results.items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before:
+            continue
+        for metric in worse_when_higher:
+            if metric in now and metric in before:
+                grew = now[metric] - before[metric]
+                if grew > NOISE_FLOOR[metric] and now[metric] > before[metric] * (1 + TOLERANCE):
+                    regressions.append((scenario, metric, before[metric], now[metric]))
+        if "throughput_per_s" in now and "throughput_per_s" in before:
+            if now["throughput_per_s"] < before["throughput_per_s"] * (1 - TOLERANCE):
+                regressions.append((scenario, "throughput_per_s", before["throughput_per_s"], now["throughput_per_s"]))
+    return regressions
+
+
+def print_report(results: dict):
+    print(f"\n{'scenario':<10}{'cmds/s':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}"
+          f"{'lag p99':>9}{'lag max':>9}{'rss MiB':>9}{'openai':>8}  outcomes")
+    for name, r in results.items():
+        if "commands" not in r:
+            continue
+        print(f"{name:<10}{r['throughput_per_s']:>8}{r['latency_p50_s']:>8.2f}{r['latency_p95_s']:>8.2f}"
+              f"{r['latency_p99_s']:>8.2f}{r['latency_max_s']:>8.2f}{r['loop_lag_p99_ms']:>9}"
+              f"{r['loop_lag_max_ms']:>9}{r['peak_rss_mib']:>9}{r['openai_calls']:>8}  "
+              f"{r['outcomes']} fallbacks={r['fallbacks']}")
+    for name, r in results.items():
+        if "p95_by_command_s" in r:
+            print(f"  {name:<8} p95 by command: " + ", ".join(f"{c} {s:.2f}s" for c, s in r["p95_by_command_s"].items()))
+    if "crawl" in results:
+        c = results["crawl"]
+        print(f"\ncrawl: {c['pages']} pages in {c['seconds']}s, unchanged re-crawl {c['recrawl_unchanged_seconds']}s")
+    if "refresh" in results:
+        r = results["refresh"]
+        print(f"refresh: {r['pages_edited']} pages edited, re-crawled in {r['crawl_seconds']}s during the burst")
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="quintin-load-")
+    with open(os.path.join(ROOT, "lore_index.json"), "r", encoding="utf-8") as f:
+        real_index = json.load(f)
+
+    fake_openai = FakeOpenAI(latency=args.latency, jitter=args.jitter, per_token=args.per_token,
+                             error_rate=args.error_rate, slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    site = FakeSite(real_index, extra_pages=args.extra_pages, seed=args.seed)
+    await fake_openai.start()
+    await site.start()
+    try:
+        # The bot reads its lore files from the working directory, so give it a copy pointing at the local site.
+        with open(os.path.join(workdir, "lore_index.json"), "w", encoding="utf-8") as f:
+            json.dump({key: site.local_url(url) for key, url in real_index.items()}, f, indent=2)
+        shutil.copy(os.path.join(ROOT, "lore_aliases.json"), workdir)
+        os.environ.update({
+            "OPENAI_API_KEY": "fake",
+            "OPENAI_BASE_URL": fake_openai.base_url,
+            "GUILD_CONFIG_FILE": os.path.join(workdir, "guilds.db"),
+            "COMMAND_HASH_FILE": os.path.join(workdir, "command_tree_hash"),
+            "SONG_LIBRARY_FILE": os.path.join(workdir, "song_library.json"),
+            "METRICS_TRACE_FILE": "",
+        })
+        os.chdir(workdir)
+        return await scenarios(args, workdir, fake_openai, site)
+    finally:
+        os.chdir(ROOT)
+        await site.stop()
+        await fake_openai.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def median_results(runs: list):
+    # Metric by metric across runs; counts missing from a run (an outcome that didn't happen) are 0.
+    first = runs[0]
+    if isinstance(first, dict):
+        keys = list(dict.fromkeys(key for run in runs for key in run))
+        return {key: median_results([run.get(key, 0) for run in runs]) for key in keys}
+    if all(isinstance(value, (int, float)) for value in runs):
+        middle = statistics.median(runs)
+        return round(middle, 3) if isinstance(middle, float) else middle
+    return first
+
+
+def run_separately(args) -> dict:
+    # Each run gets a fresh interpreter: imported modules, caches and pools would carry over otherwise.
+    forwarded = [
+        f"--{name.replace('_', '-')}={value}" for name, value in vars(args).items()
+        if name not in ("baseline", "save", "json", "runs", "result_file")
+    ]
+    runs = []
+    for n in range(args.runs):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            result_file = f.name
+        try:
+            print(f"🔁 Run {n + 1}/{args.runs}", flush=True)
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *forwarded, "--runs=1", f"--result-file={result_file}"],
+                stdout=subprocess.DEVNULL if not args.json else sys.stderr,
+            )
+            if child.returncode != 0:
+                raise SystemExit(f"❌ Run {n + 1} failed (exit {child.returncode}).")
+            with open(result_file, "r", encoding="utf-8") as f:
+                runs.append(json.load(f))
+        finally:
+            os.remove(result_file)
+    return median_results(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the bot's commands against local fakes.")
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--guilds", type=int, default=8)
+    parser.add_argument("--per-user", type=int, default=2, help="commands per user (admission allows bursts of 3)")
+    parser.add_argument("--spread", type=float, default=5.0, help="seconds over which the burst arrives")
+    parser.add_argument("--latency", type=float, default=0.6, help="OpenAI time to first token")
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--per-token", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    # Off by default: which call draws a stall is down to timing, and one stall moves p95 by seconds.
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of OpenAI calls that stall (try 0.02)")
+    parser.add_argument("--slow-latency", type=float, default=8.0)
+    parser.add_argument("--extra-pages", type=int, default=150, help="filler pages on the fake site")
+    parser.add_argument("--edit-fraction", type=float, default=0.2, help="share of pages edited before the refresh")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--runs", type=int, default=3, help="separate runs; every metric is the median across them")
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)  # set on the per-run child processes
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    if args.runs > 1:
+        results = run_separately(args)
+    else:
+        random.seed(args.seed)  # the fake OpenAI's latency and error draws
+        results = asyncio.run(run(args))
+    if args.result_file:
+        with open(args.result_file, "w", encoding="utf-8") as f:
+            json.dump(results, f)
+        return
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("baseline", "save", "json", "result_file")}
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": sys.version.split()[0],
+                "cpus": os.cpu_count(),
+                "settings": settings,
+                "scenarios": results,
+            }, f, indent=2)
+        print(f"\n💾 Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet; run with --save to record one.")
+        return
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print("\n⚠️ Settings differ from the baseline's, so the comparison is only rough.")
+    regressions = compare(results, baseline)
+    if not regressions:
+        print(f"\n✅ No regressions against the baseline from {baseline.get('saved')}.")
+        return
+    print(f"\n❌ {len(regressions)} regression(s) against the baseline from {baseline.get('saved')}:")
+    for scenario, metric, before, after in regressions:
+        print(f"  {scenario}.{metric}: {before} -> {after}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_discord import FakeDiscord, make_guilds, shard_for, wait_for  # noqa: E402
+
+# 🔹 Runs the real bot from main.py against a local fake gateway and checks
+# that each shard identifies once, every guild lands on the right shard,
+# ambience only goes to this process's guilds and command sync is skipped
+# once nothing changed. --processes N splits the shards across N processes
+# the way SHARD_IDS would in production, and checks they cover every guild once.
+
+
+def shard_ranges(shards: int, processes: int) -> list:
+    per = -(-shards // processes)
+    return [f"{start}-{min(start + per, shards) - 1}" for start in range(0, shards, per)]
+
+
+async def run_shards(args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="quintin-shards-")
+    os.environ.update({
+        "PORT": "0",
+        "SHARD_COUNT": str(args.shards),
+        "SHARD_IDS": args.shard_ids or "",
+        "GUILD_CONFIG_FILE": os.path.join(tmp, "guilds.db"),
+        "COMMAND_HASH_FILE": os.path.join(tmp, "command_tree_hash"),
+        "SONG_LIBRARY_FILE": os.path.join(tmp, "song_library.json"),
+        "METRICS_TRACE_FILE": "",
+    })
+    os.chdir(ROOT)
+
+    guilds = make_guilds(args.guilds)
+    fake = FakeDiscord(guilds, args.shards)
+    await fake.start()
+    fake.install()
+
+    import main
+    from guild_config import guild_configs
+
+    async def no_identify_wait(shard_id, *, initial=False):
+        pass  # Discord's 5s IDENTIFY spacing means nothing against a local server
+
+    main.bot.before_identify_hook = no_identify_wait
+    for guild in guilds:
+        guild_configs.update(guild["id"], allowed_channels=frozenset({guild["channels"][0]}),
+                             ambience_channel=guild["channels"][1])
+
+    started = time.perf_counter()
+    bot_task = asyncio.create_task(main.bot.start("fake-token"))
+    try:
+        await wait_for(lambda: main.scheduler is not None or bot_task.done(), timeout=args.timeout)
+        if bot_task.done():
+            bot_task.result()
+        ready_after = time.perf_counter() - started
+
+        expected_shards = main.SHARD_IDS or list(range(args.shards))
+        expected_guilds = {g["id"] for g in guilds if shard_for(g["id"], args.shards) in expected_shards}
+        local_guilds = {g.id for g in main.bot.guilds}
+        misrouted = [g.id for g in main.bot.guilds if g.shard_id != shard_for(g.id, args.shards)]
+
+        await main.tavern_ambience()
+        ambience = {g["channels"][1] for g in guilds if g["id"] in expected_guilds}
+        sent_to = {channel for channel, _ in fake.messages}
+
+        global_syncs = [count for guild_id, count in fake.command_syncs if guild_id is None]
+        resynced = await main.sync_commands()
+
+        lookups = 100_000
+        guild_id, channel_id = guilds[-1]["id"], guilds[-1]["channels"][0]
+        t0 = time.perf_counter()
+        for _ in range(lookups):
+            guild_configs.allows(guild_id, channel_id)
+        lookup_ns = (time.perf_counter() - t0) / lookups * 1e9
+
+        checks = {
+            "each_shard_identified_once": sorted(s for s, _ in fake.identified) == sorted(expected_shards),
+            "guilds_on_this_process": local_guilds == expected_guilds,
+            "guilds_on_right_shard": not misrouted,
+            "ambience_only_to_local_guilds": sent_to == ambience,
+            "commands_synced_once": len(global_syncs) == 1,
+            "unchanged_commands_not_resynced": resynced is False,
+        }
+        return {
+            "shard_ids": expected_shards,
+            "guild_ids": sorted(local_guilds),
+            "ready_seconds": round(ready_after, 3),
+            "config_lookup_ns": round(lookup_ns, 1),
+            "checks": checks,
+        }
+    finally:
+        await main.bot.close()
+        bot_task.cancel()
+        await asyncio.gather(bot_task, return_exceptions=True)
+        if main.scheduler is not None:
+            main.scheduler.shutdown(wait=False)
+        await main.health_server.stop()
+        await fake.stop()
+
+
+def report(result: dict, label: str = "") -> bool:
+    print(f"{label}shards {result['shard_ids']}: {len(result['guild_ids'])} guilds, "
+          f"ready in {result['ready_seconds']:.2f}s, config lookup {result['config_lookup_ns']:.0f} ns")
+    for name, ok in result["checks"].items():
+        print(f"  {'✅' if ok else '❌'} {name}")
+    return all(result["checks"].values())
+
+
+def run_processes(args) -> bool:
+    # One child per shard range, like separate deployments with SHARD_IDS set.
+    children = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--guilds", str(args.guilds), "--shards", str(args.shards),
+             "--shard-ids", ids, "--json"],
+            stdout=subprocess.PIPE, text=True,
+        )
+        for ids in shard_ranges(args.shards, args.processes)
+    ]
+    results = [json.loads(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+
+    ok = all(report(result, f"process {i}: ") for i, result in enumerate(results))
+    seen = [guild_id for result in results for guild_id in result["guild_ids"]]
+    covered = len(seen) == len(set(seen)) == args.guilds
+    print(f"{'✅' if covered else '❌'} {len(set(seen))}/{args.guilds} guilds served, "
+          f"{len(seen) - len(set(seen))} served twice")
+    return ok and covered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check Quintin's sharding against a local fake gateway.")
+    parser.add_argument("--guilds", type=int, default=40)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--shard-ids", default="", help="e.g. 0-1; default is every shard")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="print the result as one JSON line")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        passed = run_processes(args)
+    else:
+        result = asyncio.run(run_shards(args))
+        if args.json:
+            print(json.dumps(result))
+            passed = all(result["checks"].values())
+        else:
+            passed = report(result)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,119 @@
+import random
+from collections import deque
+
+from metrics import record_cache
+
+# 🔹 Ready-made rumours, gossip and name-templated compliments/roasts, topped up
+# in the background while the bot is quiet so commands can answer instantly.
+NAME_PLACEHOLDER = "ADVENTURER"
+REFILL_BATCH = 3  # LLM calls per refill tick
+BATCH_ITEMS = 8   # items asked for in one batched call
+
+
+class ContentPools:
+    def __init__(self):
+        self._pools = {}       # (kind, key) -> deque
+        self._generators = {}  # kind -> async fn(key) -> str
+        self._batch_generators = {}  # kind -> async fn(keys, count) -> [(key, str)]
+        self._sizes = {}       # kind -> items kept per key
+        self.stats = {"hits": 0, "misses": 0, "refilled": 0, "refill_errors": 0}
+
+    def register(self, kind: str, generate, keys=(None,), size=5, generate_batch=None):
+        self._generators[kind] = generate
+        if generate_batch is not None:
+            self._batch_generators[kind] = generate_batch
+        self._sizes[kind] = size
+        for key in keys:
+            self._pools[(kind, key)] = deque(maxlen=size)
+
+    def set_keys(self, kind: str, keys):
+        # Re-key a registered kind, keeping whatever is already stocked for surviving keys.
+        keys = set(keys)
+        for name in [name for name in self._pools if name[0] == kind and name[1] not in keys]:
+            del self._pools[name]
+        for key in keys:
+            self._pools.setdefault((kind, key), deque(maxlen=self._sizes[kind]))
+
+    def take(self, kind: str, key=None):
+        pool = self._pools.get((kind, key))
+        if pool:
+            self.stats["hits"] += 1
+            record_cache(f"pool_{kind}", True)
+            return pool.popleft()
+        self.stats["misses"] += 1
+        record_cache(f"pool_{kind}", False)
+        return None
+
+    def take_any(self, kind: str):
+        # Any stocked key of this kind, at random: (key, item) or (None, None).
+        stocked = [key for (k, key), pool in self._pools.items() if k == kind and pool]
+        if not stocked:
+            self.stats["misses"] += 1
+            record_cache(f"pool_{kind}", False)
+            return None, None
+        key = random.choice(stocked)
+        self.stats["hits"] += 1
+        record_cache(f"pool_{kind}", True)
+        return key, self._pools[(kind, key)].popleft()
+
+    def _emptiest(self):
+        # Pools ordered by how full they are, emptiest first.
+        open_pools = [(len(p) / p.maxlen, name) for name, p in self._pools.items() if len(p) < p.maxlen]
+        random.shuffle(open_pools)
+        return [name for _, name in sorted(open_pools, key=lambda item: item[0])]
+
+    def _add(self, kind, key, item) -> bool:
+        pool = self._pools.get((kind, key))
+        if not item or pool is None or len(pool) >= pool.maxlen:
+            return False
+        pool.append(item)
+        self.stats["refilled"] += 1
+        return True
+
+    async def refill(self, is_idle=lambda: True, budget=REFILL_BATCH) -> int:
+        made = 0
+        pending = self._emptiest()
+        for _ in range(budget):
+            # Stop as soon as real users need the LLM.
+            if not pending or not is_idle():
+                break
+            kind, key = pending[0]
+            batch = self._batch_generators.get(kind)
+            try:
+                if batch:
+                    # One call for the emptiest slots of this kind, spread across its keys.
+                    wanted = []
+                    for name in pending:
+                        if name[0] == kind:
+                            pool = self._pools[name]
+                            wanted.extend([name[1]] * (pool.maxlen - len(pool)))
+                    wanted = wanted[:BATCH_ITEMS]
+                    pending = [name for name in pending if name[0] != kind]
+                    items = await batch(list(dict.fromkeys(wanted)), len(wanted))
+                    made += sum(self._add(kind, k, item) for k, item in items)
+                else:
+                    pending.pop(0)
+                    made += self._add(kind, key, await self._generators[kind](key))
+            except Exception as e:
+                self.stats["refill_errors"] += 1
+                print(f"⚠️ Couldn't refill the {kind} pool: {e}")
+        return made
+
+    def summary(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        stocked, capacity = {}, {}
+        for (kind, _), pool in self._pools.items():
+            stocked[kind] = stocked.get(kind, 0) + len(pool)
+            capacity[kind] = capacity.get(kind, 0) + pool.maxlen
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "stocked": {kind: f"{stocked[kind]}/{capacity[kind]}" for kind in stocked},
+        }
+
+
+def fill_name(template: str, name: str) -> str:
+    return template.replace(NAME_PLACEHOLDER, name)
+
+
+content_pools = ContentPools()
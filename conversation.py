@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+
+from retrieval import estimate_tokens
+
+# 🔹 Per-channel conversation memory for /askquintin: the last few exchanges
+# verbatim under a hard token budget, with anything older folded into a short
+# running summary, so the prompt stays the same size however long people talk.
+TURN_BUDGET = int(os.getenv("MEMORY_TURN_TOKENS", "600"))        # recent exchanges, verbatim
+SUMMARY_BUDGET = int(os.getenv("MEMORY_SUMMARY_TOKENS", "150"))  # everything older
+MAX_TURN_TOKENS = 250            # one side of an exchange is clipped to this before storing
+IDLE_TTL = 30 * 60               # seconds before a quiet channel's memory is dropped
+MAX_CHANNELS = int(os.getenv("MEMORY_MAX_CHANNELS", "500"))
+MAX_TOTAL_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", str(200_000)))  # across every channel
+
+
+def clip(text: str, budget: int) -> str:
+    # Cut to roughly `budget` tokens at a word boundary.
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit] + "…"
+
+
+def clip_front(text: str, budget: int) -> str:
+    # Like clip, but keeps the end: the newest part of a summary matters most.
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    tail = text[-limit:]
+    cut = tail.find(" ")
+    return "…" + (tail[cut + 1:] if 0 <= cut < limit // 2 else tail)
+
+
+def fold_locally(summary: str, turns: list) -> str:
+    # Cheap stand-in for an LLM summary: the gist of each exchange, newest last.
+    notes = [f"{speaker} asked: {clip(prompt, 25)} Quintin: {clip(reply, 25)}" for speaker, prompt, reply, _ in turns]
+    return clip_front(" ".join(filter(None, [summary, *notes])), SUMMARY_BUDGET)
+
+
+class ChannelMemory:
+    __slots__ = ("turns", "tokens", "summary", "overflow", "last_used", "summarising")
+
+    def __init__(self):
+        self.turns = deque()   # (speaker, prompt, reply, tokens), oldest first
+        self.tokens = 0
+        self.summary = ""
+        self.overflow = []     # turns pushed out of the budget, not yet summarised
+        self.last_used = time.monotonic()
+        self.summarising = False
+
+    @property
+    def size(self) -> int:
+        return self.tokens + estimate_tokens(self.summary)
+
+
+class ConversationMemory:
+    def __init__(self, summarise=None, turn_budget=TURN_BUDGET, max_channels=MAX_CHANNELS,
+                 max_total_tokens=MAX_TOTAL_TOKENS, idle_ttl=IDLE_TTL):
+        self.summarise = summarise  # async (summary, turns) -> str, or None to always fold locally
+        self.turn_budget = turn_budget
+        self.max_channels = max_channels
+        self.max_total_tokens = max_total_tokens
+        self.idle_ttl = idle_ttl
+        self._channels = OrderedDict()  # channel id -> ChannelMemory, least recently used first
+        self._tasks = set()
+        self.total_tokens = 0
+
+    def history(self, channel_id) -> tuple:
+        # (summary, chat messages) to put in front of the new prompt.
+        memory = self._channels.get(channel_id)
+        if memory is None:
+            return "", []
+        memory.last_used = time.monotonic()
+        self._channels.move_to_end(channel_id)
+        messages = []
+        for speaker, prompt, reply, _ in memory.turns:
+            messages.append({"role": "user", "content": f"{speaker}: {prompt}"})
+            messages.append({"role": "assistant", "content": reply})
+        return memory.summary, messages
+
+    def remember(self, channel_id, speaker: str, prompt: str, reply: str):
+        memory = self._channels.get(channel_id)
+        if memory is None:
+            memory = self._channels[channel_id] = ChannelMemory()
+            self.total_tokens += memory.size
+        self._channels.move_to_end(channel_id)
+        memory.last_used = time.monotonic()
+
+        before = memory.size
+        prompt, reply = clip(prompt, MAX_TURN_TOKENS), clip(reply, MAX_TURN_TOKENS)
+        tokens = estimate_tokens(speaker) + estimate_tokens(prompt) + estimate_tokens(reply)
+        memory.turns.append((speaker, prompt, reply, tokens))
+        memory.tokens += tokens
+        while memory.tokens > self.turn_budget and len(memory.turns) > 1:
+            old = memory.turns.popleft()
+            memory.tokens -= old[3]
+            memory.overflow.append(old)
+        self.total_tokens += memory.size - before
+
+        if memory.overflow and not memory.summarising:
+            self._start_summary(channel_id, memory)
+        self._enforce_caps()
+
+    def _start_summary(self, channel_id, memory):
+        memory.summarising = True
+        task = asyncio.get_running_loop().create_task(self._summarise(channel_id, memory))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarise(self, channel_id, memory):
+        # Runs off the reply path; until it lands, the pushed-out turns simply aren't in the prompt.
+        try:
+            while memory.overflow:
+                turns, memory.overflow = memory.overflow, []
+                summary = None
+                if self.summarise is not None:
+                    try:
+                        summary = await self.summarise(memory.summary, turns)
+                    except Exception as e:
+                        print(f"⚠️ Couldn't summarise channel {channel_id}: {e}")
+                before = memory.size
+                memory.summary = clip_front(summary, SUMMARY_BUDGET) if summary else fold_locally(memory.summary, turns)
+                if self._channels.get(channel_id) is memory:
+                    self.total_tokens += memory.size - before
+        finally:
+            memory.summarising = False
+
+    def _drop(self, channel_id):
+        memory = self._channels.pop(channel_id)
+        self.total_tokens -= memory.size
+
+    def _enforce_caps(self):
+        while self._channels and (len(self._channels) > self.max_channels or self.total_tokens > self.max_total_tokens):
+            self._drop(next(iter(self._channels)))
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [channel_id for channel_id, memory in self._channels.items() if memory.last_used < cutoff]
+        for channel_id in idle:
+            self._drop(channel_id)
+        return len(idle)
+
+    def forget(self, channel_id):
+        if channel_id in self._channels:
+            self._drop(channel_id)
+
+    def stats(self) -> dict:
+        return {"channels": len(self._channels), "tokens": self.total_tokens}
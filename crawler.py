@@ -1,40 +1,203 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+import aiohttp
+
+from extract import extract_async, shutdown_pool
+from lore_store import LORE_INDEX_FILE, STORE_FILE, compile_store
 
 BASE = "https://sordiavignti.xyz/"
-visited = set()
-lore_urls = []
+STATE_FILE = "crawl_state.json"
+OUTPUT_FILE = "master_lore.txt"
+CONCURRENCY = 8
+REQUEST_TIMEOUT = 20
+CHECKPOINT_EVERY = 25  # pages between state saves, so an interrupted crawl can resume
+
+
+class Crawler:
+    def __init__(self, base=BASE, state_file=STATE_FILE, concurrency=CONCURRENCY):
+        self.base = base
+        self.state_file = state_file
+        self.concurrency = concurrency
+        self.pages = {}
+        self.seen = []
+        self.queue = asyncio.Queue()
+        self._seen_set = set()
+        self._pending = set()
+        self.stats = {"pages": 0, "fetched": 0, "unchanged": 0, "errors": 0, "bytes": 0}
+        self._since_checkpoint = 0
+        self._load_state()
+
+    # 🔹 Crawl state: per-URL validators/hashes plus the in-progress frontier
+    def _load_state(self):
+        if not os.path.exists(self.state_file):
+            return
+        with open(self.state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("base") != self.base:
+            return
+        self.pages = state.get("pages", {})
+        run = state.get("run")
+        if run:
+            self.seen = run["seen"]
+            self._seen_set = set(self.seen)
+            self._pending = set(run["pending"])
+            for url in run["pending"]:
+                self.queue.put_nowait(url)
+            print(f"↩️ Resuming crawl: {len(self.seen)} seen, {len(run['pending'])} pending.")
+
+    def save_state(self, finished=False):
+        state = {"base": self.base, "pages": self.pages}
+        if not finished:
+            state["run"] = {"seen": self.seen, "pending": [url for url in self.seen if url in self._pending]}
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_file)
+
+    def _enqueue(self, url):
+        if url in self._seen_set or not url.startswith(self.base):
+            return
+        self._seen_set.add(url)
+        self.seen.append(url)
+        self._pending.add(url)
+        self.queue.put_nowait(url)
+
+    async def _fetch(self, session, url):
+        cached = self.pages.get(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 304 and cached:
+                self.stats["unchanged"] += 1
+                return cached["links"]
+            if resp.status != 200:
+                raise aiohttp.ClientResponseError(
+                    resp.request_info, resp.history, status=resp.status, message=resp.reason
+                )
+            if "html" not in resp.headers.get("Content-Type", "text/html"):
+                return []
+            body = await resp.read()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+
+        self.stats["fetched"] += 1
+        self.stats["bytes"] += len(body)
+        digest = hashlib.sha256(body).hexdigest()
+        if cached and cached.get("hash") == digest:
+            self.stats["unchanged"] += 1
+            cached.update(etag=etag, last_modified=last_modified)
+            return cached["links"]
+
+        # Parsed in the extraction pool, so the other workers keep fetching meanwhile.
+        page = await extract_async(url, body.decode(resp.get_encoding() or "utf-8", "replace"))
+        self.pages[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": digest,
+            "title": page.title,
+            "text": page.text,
+            "links": page.links,
+        }
+        return page.links
 
+    async def _worker(self, session):
+        while True:
+            url = await self.queue.get()
+            try:
+                for link in await self._fetch(session, url):
+                    self._enqueue(link)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ Failed to fetch {url}: {e}")
+            except Exception as e:
+                # A page we can't parse must not take the worker down with it, or queue.join() never returns.
+                self.stats["errors"] += 1
+                print(f"⚠️ Failed to process {url}: {type(e).__name__}: {e}")
+            # Not in a finally: a cancelled fetch stays pending for the next resume.
+            self._pending.discard(url)
+            self.stats["pages"] += 1
+            self.queue.task_done()
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= CHECKPOINT_EVERY:
+                self._since_checkpoint = 0
+                self.save_state()
 
-def crawl(url):
-    if url in visited or not url.startswith(BASE):
-        return
-    visited.add(url)
+    async def run(self):
+        if not self.seen:
+            self._enqueue(self.base)
+
+        started = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            workers = [asyncio.create_task(self._worker(session)) for _ in range(self.concurrency)]
+            try:
+                await self.queue.join()
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if self.queue.empty() and not self._pending and self.stats["fetched"] + self.stats["unchanged"]:
+                    # Drop pages that are no longer linked from anywhere (unless the site never answered).
+                    self.pages = {url: self.pages[url] for url in self.seen if url in self.pages}
+                    self.save_state(finished=True)
+                else:
+                    self.save_state()
+
+        elapsed = time.perf_counter() - started
+        self.stats["seconds"] = round(elapsed, 2)
+        self.stats["pages_per_sec"] = round(self.stats["pages"] / elapsed, 2) if elapsed else 0.0
+        return self.stats
+
+    def write_master_lore(self, path=OUTPUT_FILE):
+        with open(path, "w", encoding="utf-8") as f:
+            for url in self.seen:
+                page = self.pages.get(url)
+                if page:
+                    f.write(f"### {page['title']}\n\n{page['text']}\n\n")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl the Sordia Vignti lore site.")
+    parser.add_argument("base", nargs="?", default=BASE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--state", default=STATE_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--store", default=STORE_FILE)
+    parser.add_argument("--index", default=LORE_INDEX_FILE)
+    parser.add_argument("--fresh", action="store_true", help="ignore saved state and refetch everything")
+    args = parser.parse_args(argv)
+
+    if args.fresh and os.path.exists(args.state):
+        os.remove(args.state)
+
+    crawler = Crawler(args.base, args.state, args.concurrency)
     try:
-        resp = requests.get(url)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        lore_urls.append(url)
-        for a in soup.find_all("a", href=True):
-            link = urljoin(BASE, a["href"])
-            info = urlparse(link)
-            norm = info.scheme + "://" + info.netloc + info.path
-            crawl(norm)
-    except:
-        pass
-
-
-crawl(BASE)
-
-with open("master_lore.txt", "w", encoding="utf-8") as f:
-    for url in lore_urls:
-        try:
-            resp = requests.get(url)
-            soup = BeautifulSoup(resp.text, "html.parser")
-            text = soup.get_text(separator="\n").strip()
-            title = soup.find("title").text if soup.find("title") else url
-            f.write(f"### {title}\n\n{text}\n\n")
-        except Exception as e:
-            f.write(f"### ERROR {url}\n\nFailed to fetch: {e}\n\n")
-
-print(f"Crawled {len(lore_urls)} pages. Saved to master_lore.txt")
+        stats = await crawler.run()
+    finally:
+        shutdown_pool()
+    if not crawler.pages:
+        # The site is down or moved; an empty store would be worse than a stale one.
+        raise SystemExit(f"❌ Crawl got no pages ({stats['errors']} errors); left {args.output} and {args.store} as they were.")
+    crawler.write_master_lore(args.output)
+    with open(args.index, "r") as f:
+        compile_store(crawler.pages, json.load(f), args.store)
+    print(
+        f"Crawled {len(crawler.pages)} pages in {stats['seconds']}s "
+        f"({stats['pages_per_sec']} pages/sec, {stats['bytes'] / 1024:.1f} KiB fetched, "
+        f"{stats['unchanged']} unchanged, {stats['errors']} errors). Saved to {args.output} and {args.store}"
+    )
+    return crawler
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,240 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+from urllib.parse import urljoin, urlparse
+
+# 🔹 HTML -> clean lore text, shared by the crawler and /who's network
+# fallback. lxml does the parsing (bs4's html.parser if lxml is missing), site
+# chrome is dropped before any text is read, and what's left comes out as
+# headings with whole paragraphs under them. Parsing is CPU-bound, so callers
+# go through extract_async, which runs it in a small process pool.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Never lore, whatever page they're on.
+DROP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "object", "canvas",
+    "nav", "header", "footer", "aside", "form", "button", "select", "input", "textarea",
+}
+# Site chrome that isn't marked up with the tags above.
+BOILERPLATE = re.compile(
+    r"(^|[-_\s])(nav|navbar|navigation|menu|sidebar|breadcrumbs?|toc|footer|site-header|cookies?|"
+    r"banner|share|share-buttons|social|related|skip-link)($|[-_\s])",
+    re.I,
+)
+# The page's own content, when the site marks it.
+CONTENT_XPATH = "//main | //article | //*[@role='main'] | //*[@id='content'] | //*[contains(concat(' ', @class, ' '), ' content ')]"
+# Inside the content itself, <header>/<footer> are usually an article's own title and byline.
+PAGE_CHROME = {"header", "footer"}
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "dd", "details", "div", "dl", "dt", "figcaption", "figure",
+    "li", "main", "ol", "p", "pre", "section", "summary", "table", "tr", "ul",
+    "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr", "header", "footer",
+}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+CELLS = {"td", "th"}  # a table row becomes one line, cells separated by " | "
+# XHTML pages often start with <?xml ... encoding="..."?>, which lxml refuses in a str.
+XML_DECLARATION = re.compile(r"^\ufeff?\s*<\?xml[^>]*\?>")
+
+
+def normalise(base, href):
+    link = urljoin(base, href)
+    info = urlparse(link)
+    return info.scheme + "://" + info.netloc + info.path
+
+
+class Section(NamedTuple):
+    heading: str
+    paragraphs: list
+
+
+class Page(NamedTuple):
+    title: str
+    sections: list  # Section per heading, in page order; the first may have no heading
+    links: list
+
+    @property
+    def text(self) -> str:
+        # One line per heading or paragraph, which is what clean_paragraphs and master_lore.txt expect.
+        lines = []
+        for section in self.sections:
+            if section.heading:
+                lines.append(f"## {section.heading}")
+            lines.extend(section.paragraphs)
+        return "\n".join(lines)
+
+    @property
+    def paragraphs(self) -> list:
+        return [p for section in self.sections for p in section.paragraphs]
+
+
+class _Builder:
+    # Collects inline text until a block boundary, then emits it as one paragraph.
+    def __init__(self):
+        self.sections = [Section("", [])]
+        self._buffer = []
+        self._seen = set()
+
+    def add(self, text):
+        if text:
+            self._buffer.append(text)
+
+    def flush(self, heading=False):
+        text = " ".join("".join(self._buffer).split()).strip(" |")
+        self._buffer.clear()
+        if not text:
+            return
+        if heading:
+            self.sections.append(Section(text, []))
+        elif text not in self._seen:
+            self._seen.add(text)
+            self.sections[-1].paragraphs.append(text)
+
+    def page(self, title, links):
+        self.flush()
+        return Page(title, [s for s in self.sections if s.heading or s.paragraphs], links)
+
+
+def _is_boilerplate(tag, attrs, in_content=False) -> bool:
+    if tag in DROP_TAGS:
+        return not (in_content and tag in PAGE_CHROME)
+    marker = f"{attrs.get('class') or ''} {attrs.get('id') or ''}"
+    return bool(marker.strip()) and BOILERPLATE.search(marker) is not None
+
+
+def _walk_lxml(el, out):
+    tag = el.tag if isinstance(el.tag, str) else None  # comments and processing instructions
+    block = tag in BLOCK_TAGS
+    if block:
+        out.flush()
+    if tag is not None:
+        out.add(el.text)
+    for child in el:
+        _walk_lxml(child, out)
+        out.add(child.tail)
+    if tag in CELLS:
+        out.add(" | ")
+    if block:
+        out.flush(heading=tag in HEADINGS)
+
+
+def _extract_lxml(url, html):
+    import lxml.html
+    from lxml.etree import ParserError
+
+    try:
+        doc = lxml.html.document_fromstring(XML_DECLARATION.sub("", html, count=1))
+    except ParserError:  # empty or whitespace-only document
+        return Page(url, [], [])
+    title = " ".join((doc.findtext(".//title") or "").split()) or url
+    links = [normalise(url, href) for href in doc.xpath("//a/@href")]
+
+    roots = doc.xpath(CONTENT_XPATH)
+    body = doc.find("body")
+    root = roots[0] if roots else body if body is not None else doc
+    in_content = bool(roots)
+    for el in [el for el in root.iter() if isinstance(el.tag, str) and _is_boilerplate(el.tag, el.attrib, in_content)]:
+        if el is not root and el.getparent() is not None:
+            el.drop_tree()  # keeps the tail text, which belongs to the parent
+    out = _Builder()
+    _walk_lxml(root, out)
+    return out.page(title, links)
+
+
+def _walk_soup(node, out):
+    from bs4 import NavigableString, Tag
+
+    for child in node.children:
+        if isinstance(child, Tag):
+            block = child.name in BLOCK_TAGS
+            if block:
+                out.flush()
+            _walk_soup(child, out)
+            if child.name in CELLS:
+                out.add(" | ")
+            if block:
+                out.flush(heading=child.name in HEADINGS)
+        elif type(child) is NavigableString:  # skips comments, doctypes and CDATA
+            out.add(str(child))
+
+
+def _extract_soup(url, html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    title = " ".join(soup.title.get_text().split()) if soup.title else ""
+    links = [normalise(url, a["href"]) for a in soup.find_all("a", href=True)]
+    content = soup.find(["main", "article"]) or soup.find(attrs={"role": "main"}) or soup.find(id="content") \
+        or soup.find(class_="content")
+    root = content or soup.body or soup
+    for el in root.find_all(lambda tag: _is_boilerplate(
+        tag.name, {"class": " ".join(tag.get("class") or ()), "id": tag.get("id")}, content is not None
+    )):
+        if not el.decomposed:
+            el.decompose()
+    out = _Builder()
+    _walk_soup(root, out)
+    return out.page(title or url, links)
+
+
+def extract(url: str, html: str) -> Page:
+    try:
+        import lxml.html  # noqa: F401  (deferred so importing this module stays cheap for the bot)
+    except ImportError:
+        return _extract_soup(url, html)
+    return _extract_lxml(url, html)
+
+
+# 🔹 Process pool: parsing never runs on the event loop or holds its GIL
+_pool = None
+
+
+class _Worker(multiprocessing.context.ForkServerProcess):
+    def start(self):
+        # A new process re-runs the parent's __main__ script before anything else, and for
+        # the bot that's all of main.py. Workers only need this module, so leave the path out.
+        main = sys.modules["__main__"]
+        path = main.__dict__.pop("__file__", None)
+        try:
+            super().start()
+        finally:
+            if path is not None:
+                main.__file__ = path
+
+
+class _WorkerContext(multiprocessing.context.ForkServerContext):
+    Process = _Worker
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Never fork: the bot is multi-threaded by now, and a forked child can inherit a lock someone was holding.
+        ctx = _WorkerContext()
+        # The forkserver imports this module once and every worker starts as a copy of it.
+        ctx.set_forkserver_preload(["extract"])
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=ctx)
+    return _pool
+
+
+async def extract_async(url: str, html: str) -> Page:
+    global _pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_pool(), extract, url, html)
+    except BrokenProcessPool:
+        # A worker died (OOM kill, usually); start a fresh pool next time and get this page done in a thread.
+        print("⚠️ Extraction pool broke, restarting it.")
+        _pool = None
+        return await asyncio.to_thread(extract, url, html)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
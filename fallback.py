@@ -0,0 +1,105 @@
+import random
+import re
+
+# 🔹 In-character replies that need no LLM, for when OpenAI is slow or down:
+# built from Quintin's tavern chores, the menu and whatever lore the store
+# already holds, so every command still gets an answer straight away.
+SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+SNIPPET_CHARS = 320
+MIN_SNIPPET_SOURCE = 60  # paragraphs shorter than this are headings and captions
+
+RUMOUR_OPENERS = [
+    "Word around the bar is this:",
+    "Don't repeat it, but an old regular swore to me:",
+    "Wrote this one in the ledger myself:",
+    "Heard it from a traveller who wouldn't give his name:",
+]
+MENU_GOSSIP = [
+    "Someone keeps ordering the {food} and leaving before it arrives. Third night running.",
+    "A hooded stranger paid for a round of {drink} in coins nobody in Alexandria has ever seen.",
+    "The cook swears the {food} moved on its own last night. The cook also had the {drink}.",
+    "Two adventurers bet their horses on who could finish the {drink} faster. Both are walking home.",
+]
+COMPLIMENTS = [
+    "Quintin raises a mug. 'To {name}: finer than the {drink} and twice as hard to forget.'",
+    "'{name}, if you were on the menu you'd be the {food}, and we'd sell out by noon.'",
+    "Quintin nods at {name}. 'Rare to see someone walk in here looking better than the {food} smells.'",
+    "'{name}! The {drink}'s on the house tonight. Don't tell the others.'",
+]
+INSULTS = [
+    "'{name}, I've served {food} with more backbone than you.'",
+    "Quintin squints at {name}. 'You remind me of the {drink}: best taken in small amounts.'",
+    "'{name}, even the {food} gets complimented more than you, and nobody knows what's in it.'",
+    "'Another round of {drink} for {name}. Might make the conversation bearable.'",
+]
+
+
+def plain(description: str) -> str:
+    return description.strip("*").strip()
+
+
+def lore_paragraphs(lore: str) -> list:
+    # retrieve_lore's output without its "[Page title]" lines and "(Couldn't load ...)" notes.
+    return [
+        line.strip() for line in lore.split("\n")
+        if line.strip() and not line.startswith(("[", "("))
+    ]
+
+
+def snippet(paragraphs: list):
+    # A sentence or two from one paragraph, short enough to read at a glance.
+    candidates = [p for p in paragraphs if len(p) >= MIN_SNIPPET_SOURCE]
+    if not candidates:
+        return None
+    text = ""
+    for sentence in SENTENCE_RE.split(random.choice(candidates)):
+        if text and len(text) + len(sentence) > SNIPPET_CHARS:
+            break
+        text = f"{text} {sentence}".strip()
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+class LocalFallback:
+    def __init__(self, chores: list, food_menu: dict, drink_menu: dict, lore=lambda topic=None: []):
+        self.chores = chores
+        self.food_menu = food_menu
+        self.drink_menu = drink_menu
+        self.lore = lore  # (topic or None) -> paragraphs already on hand; must not touch the network
+
+    def _menu(self) -> dict:
+        food = random.choice(list(self.food_menu))
+        drink = random.choice(list(self.drink_menu))
+        return {"food": food, "drink": drink}
+
+    def answer(self, topic_names: str, lore: str) -> str:
+        chore = random.choice(self.chores)
+        found = snippet(lore_paragraphs(lore))
+        if found:
+            about = f" on {topic_names}" if topic_names else ""
+            return f"{chore}\n'Can't stop to chat, friend, but here's what the ledger says{about}:'\n> {found}"
+        drink = random.choice(list(self.drink_menu))
+        return (
+            f"{chore}\n'Run off my feet right now, friend. Have a {drink} while you wait.' "
+            f"{plain(self.drink_menu[drink])}"
+        )
+
+    def clue(self, topic: str, lore: str) -> str:
+        found = snippet(lore_paragraphs(lore))
+        if found:
+            return f"'No time to ask around tonight, but this is written in the ledger:'\n> {found}"
+        return f"'Nobody's talking about *{topic}* tonight. Ask me again when the rush dies down.'"
+
+    def rumour(self, topic=None) -> str:
+        found = snippet(self.lore(topic))
+        if found:
+            return f"{random.choice(RUMOUR_OPENERS)} {found}"
+        return random.choice(MENU_GOSSIP).format(**self._menu())
+
+    def gossip(self) -> str:
+        return self.rumour()
+
+    def compliment(self, name: str) -> str:
+        return random.choice(COMPLIMENTS).format(name=name, **self._menu())
+
+    def insult(self, name: str) -> str:
+        return random.choice(INSULTS).format(name=name, **self._menu())
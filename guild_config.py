@@ -0,0 +1,98 @@
+import json
+import os
+import sqlite3
+import time
+from typing import NamedTuple
+
+# 🔹 Per-guild settings: which channels count as the tavern, where the idle
+# ambience goes, and any persona tweaks. Stored in SQLite and held in memory
+# as a dict, so each command's lookup is a single dict access.
+CONFIG_FILE = os.getenv("GUILD_CONFIG_FILE", "guilds.db")
+RELOAD_INTERVAL = 30  # seconds between checks for writes from other shard processes
+
+
+class GuildConfig(NamedTuple):
+    guild_id: int
+    allowed_channels: frozenset = frozenset()  # empty = any channel in the guild
+    ambience_channel: int = None
+    persona: str = ""
+
+    def allows(self, channel_id: int) -> bool:
+        return not self.allowed_channels or channel_id in self.allowed_channels
+
+
+class GuildConfigStore:
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self._db = None
+        self._configs = {}
+        self._data_version = None
+        self._checked = 0.0
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS guilds (
+                    guild_id INTEGER PRIMARY KEY,
+                    allowed_channels TEXT NOT NULL DEFAULT '[]',
+                    ambience_channel INTEGER,
+                    persona TEXT NOT NULL DEFAULT ''
+                )
+                """
+            )
+            self._db.commit()
+        return self._db
+
+    def _reload(self):
+        db = self._connect()
+        rows = db.execute("SELECT guild_id, allowed_channels, ambience_channel, persona FROM guilds").fetchall()
+        self._configs = {
+            guild_id: GuildConfig(guild_id, frozenset(json.loads(channels)), ambience, persona)
+            for guild_id, channels, ambience, persona in rows
+        }
+        self._data_version = db.execute("PRAGMA data_version").fetchone()[0]
+        self._checked = time.monotonic()
+
+    def _maybe_reload(self):
+        # Other shard processes may share the file; data_version moves when they write.
+        if self._data_version is None:
+            self._reload()
+        elif time.monotonic() - self._checked > RELOAD_INTERVAL:
+            self._checked = time.monotonic()
+            if self._connect().execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+                self._reload()
+
+    def get(self, guild_id: int) -> GuildConfig:
+        self._maybe_reload()
+        return self._configs.get(guild_id) or GuildConfig(guild_id)
+
+    def allows(self, guild_id: int, channel_id: int) -> bool:
+        # The tavern only exists inside a server, never in DMs.
+        return guild_id is not None and self.get(guild_id).allows(channel_id)
+
+    def all(self) -> list:
+        self._maybe_reload()
+        return list(self._configs.values())
+
+    def update(self, guild_id: int, **changes) -> GuildConfig:
+        config = self.get(guild_id)._replace(**changes)
+        db = self._connect()
+        db.execute(
+            "INSERT OR REPLACE INTO guilds VALUES (?, ?, ?, ?)",
+            (guild_id, json.dumps(sorted(config.allowed_channels)), config.ambience_channel, config.persona),
+        )
+        db.commit()
+        self._configs[guild_id] = config
+        return config
+
+    def seed(self, guild_id: int, channel_id: int):
+        # First run after moving off the single hard-wired guild: keep it working as before.
+        self._maybe_reload()
+        if guild_id not in self._configs:
+            self.update(guild_id, allowed_channels=frozenset({channel_id}), ambience_channel=channel_id)
+
+
+guild_configs = GuildConfigStore()
@@ -1,16 +1,97 @@
-from flask import Flask
-from threading import Thread
+import asyncio
+import math
+import os
+import time
 
-app = Flask('')
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return "Quintin is alive, stew's on."
+from metrics import metrics
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+# 🔹 Health and readiness server, running on the bot's own event loop. Readiness
+# reflects the real state of the gateway, the loop, the scheduler and OpenAI.
+PORT = int(os.getenv("PORT", "8080"))
+LAG_PROBE_INTERVAL = 1.0   # seconds between event-loop lag probes
+MAX_LOOP_LAG = 0.5         # seconds of lag before we report not-ready
+LLM_STALE_AFTER = 15 * 60  # seconds without a successful LLM call before it's flagged
 
-def keep_alive():
-    t = Thread(target=run)
-    t.daemon = True
-    t.start()
+
+class HealthServer:
+    def __init__(self, bot, scheduler=None, llm=None, port=PORT, llm_guard=None):
+        self.bot = bot
+        self.scheduler = scheduler
+        self.llm = llm
+        self.llm_guard = llm_guard
+        self.port = port
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self._runner = None
+        self._probe = None
+
+    async def _probe_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.loop_lag = max(0.0, loop.time() - started - LAG_PROBE_INTERVAL)
+            self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+
+    def readiness(self) -> dict:
+        latency = self.bot.latency
+        # is_ready() stays True through disconnects and reconnects, so ask each shard's websocket.
+        shards_down = sorted(shard_id for shard_id, shard in self.bot.shards.items() if shard.is_closed())
+        gateway = self.bot.is_ready() and not self.bot.is_closed() and bool(self.bot.shards) and not shards_down
+        scheduler = self.scheduler is None or self.scheduler.running
+        last_llm = getattr(self.llm, "last_success", None)
+        checks = {
+            "gateway_connected": gateway,
+            "event_loop_responsive": self.loop_lag < MAX_LOOP_LAG,
+            "scheduler_running": scheduler,
+        }
+        return {
+            "ready": all(checks.values()),
+            "checks": checks,
+            "shards_down": shards_down,
+            "websocket_latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+            "event_loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "event_loop_max_lag_ms": round(self.max_loop_lag * 1000, 1),
+            "last_llm_success_age_s": round(time.time() - last_llm, 1) if last_llm else None,
+            "llm_stale": last_llm is not None and time.time() - last_llm > LLM_STALE_AFTER,
+            # Informational: with the circuit open, commands answer from local fallbacks.
+            "llm_circuit": self.llm_guard.breaker.state if self.llm_guard else None,
+        }
+
+    async def home(self, request):
+        return web.Response(text="Quintin is alive, stew's on.")
+
+    async def ready(self, request):
+        report = self.readiness()
+        return web.json_response(report, status=200 if report["ready"] else 503)
+
+    async def prometheus_metrics(self, request):
+        lines = [
+            "# TYPE quintin_event_loop_lag_seconds gauge",
+            f"quintin_event_loop_lag_seconds {self.loop_lag:.6f}",
+        ]
+        return web.Response(
+            text=metrics.render_prometheus() + "\n".join(lines) + "\n",
+            content_type="text/plain",
+            headers={"X-Prometheus-Format": "0.0.4"},
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/", self.home)
+        app.router.add_get("/healthz", self.home)
+        app.router.add_get("/readyz", self.ready)
+        app.router.add_get("/metrics", self.prometheus_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "0.0.0.0", self.port).start()
+        self._probe = asyncio.create_task(self._probe_loop_lag())
+        print(f"🩺 Health server listening on :{self.port}")
+
+    async def stop(self):
+        if self._probe:
+            self._probe.cancel()
+        if self._runner:
+            await self._runner.cleanup()
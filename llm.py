@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from metrics import record_tokens
+
+# 🔹 One place for the model, Quintin's persona and how hard we lean on OpenAI
+MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+PERSONA = (
+    "You are Quintin, the barkeep of the Lucky Griffon in Alexandria. "
+    "You speak with dry humour and warmth, and never break character."
+)
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 20.0
+
+MAX_ITEM_LENGTH = 600  # batched items longer than this are discarded as malformed
+CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def retryable_errors() -> tuple:
+    # openai is slow to import, so it's only loaded once the first call is made.
+    import openai
+
+    return (
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.APIConnectionError,  # includes APITimeoutError
+    )
+
+
+def _retry_delay(error, attempt):
+    # Respect the server's Retry-After when it gives one, else exponential backoff with jitter.
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_CAP)
+            except ValueError:
+                pass
+    return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_CAP) * random.uniform(0.5, 1.0)
+
+
+def parse_json_items(text: str, keys=("text",)) -> list:
+    # Batched replies are a JSON array of objects; keep only the well-formed ones.
+    text = CODE_FENCE_RE.sub("", text.strip())
+    try:
+        data = json.loads(text[text.find("["): text.rfind("]") + 1])
+    except ValueError:
+        return []
+    if not isinstance(data, list):
+        return []
+    items = []
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        values = [item.get(key) for key in keys]
+        if all(isinstance(v, str) and v.strip() and len(v) <= MAX_ITEM_LENGTH for v in values):
+            items.append({key: value.strip() for key, value in zip(keys, values)})
+    return items
+
+
+class CompletionService:
+    def __init__(
+        self,
+        api_key=None,
+        model=MODEL,
+        persona=PERSONA,
+        max_in_flight=MAX_IN_FLIGHT,
+        timeout=REQUEST_TIMEOUT,
+        max_retries=MAX_RETRIES,
+        base_url=None,
+    ):
+        self._api_key = api_key
+        self._base_url = base_url
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.model = model
+        self.persona = persona
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.last_success = None  # wall-clock time of the last completed call
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            # Retries are handled here so the semaphore isn't held while backing off.
+            self._client = AsyncOpenAI(
+                api_key=self._api_key, base_url=self._base_url, max_retries=0, timeout=self.timeout
+            )
+        return self._client
+
+    def build_messages(self, instructions: str = "", prompt: str = None, history=()) -> list:
+        system = self.persona + ("\n\n" + instructions if instructions else "")
+        messages = [{"role": "system", "content": system}, *history]
+        if prompt is not None:
+            messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _record_usage(self, usage):
+        self.usage["calls"] += 1
+        if usage:
+            self.usage["prompt_tokens"] += usage.prompt_tokens
+            self.usage["completion_tokens"] += usage.completion_tokens
+            record_tokens(usage.prompt_tokens, usage.completion_tokens)
+
+    @property
+    def idle(self) -> bool:
+        return self.in_flight == 0
+
+    async def complete(self, instructions: str = "", prompt: str = None, timeout: float = None, history=()) -> str:
+        messages = self.build_messages(instructions, prompt, history)
+        timeout = timeout or self.timeout
+
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    self.in_flight += 1
+                    try:
+                        response = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            timeout=timeout,
+                        )
+                    finally:
+                        self.in_flight -= 1
+                self._record_usage(response.usage)
+                self.last_success = time.time()
+                return (response.choices[0].message.content or "").strip()  # None on refusals and filtered replies
+            except retryable_errors() as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = _retry_delay(e, attempt)
+                print(f"⏳ OpenAI call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def stream(self, instructions: str = "", prompt: str = None, timeout: float = None, history=()):
+        # Yields text deltas as they arrive. Retries only happen before the first
+        # token — once the user has seen text, a failure is the caller's problem.
+        messages = self.build_messages(instructions, prompt, history)
+        timeout = timeout or self.timeout
+
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self._semaphore:
+                    self.in_flight += 1
+                    try:
+                        stream = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            timeout=timeout,
+                            stream=True,
+                            stream_options={"include_usage": True},
+                        )
+                        usage = None
+                        async for chunk in stream:
+                            if chunk.usage:
+                                usage = chunk.usage
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                started = True
+                                yield chunk.choices[0].delta.content
+                        self._record_usage(usage)
+                        self.last_success = time.time()
+                    finally:
+                        self.in_flight -= 1
+                return
+            except retryable_errors() as e:
+                if started or attempt >= self.max_retries:
+                    raise
+                delay = _retry_delay(e, attempt)
+                print(f"⏳ OpenAI stream failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def complete_items(self, instructions: str, prompt: str, count: int, keys=("text",), timeout=None) -> list:
+        # Ask for several items in one call and get back the ones that parse.
+        fields = ", ".join(f'"{key}"' for key in keys)
+        instructions += (
+            f"\n\nReply with ONLY a JSON array of exactly {count} objects, each with the keys {fields}. "
+            "No commentary, no code fences."
+        )
+        return parse_json_items(await self.complete(instructions, prompt, timeout), keys)
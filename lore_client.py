@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+from metrics import record_cache
+
+# 🔹 Async lore fetching: one pooled session, a TTL+LRU cache keyed by URL,
+# conditional revalidation and single-flight so concurrent lookups of the
+# same page share one request.
+CACHE_TTL = 15 * 60          # seconds before a cached page gets revalidated
+CACHE_MAX_ENTRIES = 128      # pages kept in memory
+REQUEST_TIMEOUT = 10         # seconds per request
+MAX_CONNECTIONS = 8
+
+
+class LorePage:
+    __slots__ = ("url", "status", "text", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, url, status, text, etag=None, last_modified=None):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+
+
+class LoreClient:
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._session = None
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "coalesced": 0}
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            )
+        return self._session
+
+    async def fetch(self, url: str) -> LorePage:
+        url = url.strip()
+        cached = self._cache.get(url)
+        if cached and time.monotonic() - cached.fetched_at < self.ttl:
+            self._cache.move_to_end(url)
+            self.stats["hits"] += 1
+            record_cache("lore_page", True)
+            return cached
+
+        # Someone is already fetching this page — wait for their result.
+        task = self._inflight.get(url)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            record_cache("lore_page", True)
+            return await asyncio.shield(task)
+
+        record_cache("lore_page", False)
+        task = asyncio.ensure_future(self._fetch(url, cached))
+        self._inflight[url] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(url, None)
+            else:
+                task.add_done_callback(lambda _: self._inflight.pop(url, None))
+
+    async def _fetch(self, url, cached):
+        headers = {}
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        session = await self._get_session()
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached:
+                self.stats["revalidated"] += 1
+                cached.fetched_at = time.monotonic()
+                self._store(url, cached)
+                return cached
+
+            self.stats["misses"] += 1
+            text = await response.text()
+            page = LorePage(
+                url,
+                response.status,
+                text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+
+        # Only successful pages are worth keeping around.
+        if page.status == 200:
+            self._store(url, page)
+        return page
+
+    def _store(self, url, page):
+        self._cache[url] = page
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+lore_client = LoreClient()
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+from collections import defaultdict
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+from lore_store import LORE_INDEX_FILE, canonical_url
+from topic_matcher import TopicMatcher
+
+# 🔹 lore_index.json + lore_aliases.json as one immutable snapshot, along with
+# everything derived from them. A watcher rebuilds a fresh snapshot off the
+# event loop when either file changes and swaps it in with a single
+# assignment, so a command holding the old snapshot finishes on it.
+ALIASES_FILE = "lore_aliases.json"
+WATCH_INTERVAL = 15  # seconds between checks for edited files
+
+
+class LoreIndex(NamedTuple):
+    topics: dict        # topic key -> page URL, trimmed
+    aliases: dict       # alias -> topic key, only for topics that exist
+    matcher: TopicMatcher
+    page_topics: list   # one topic per distinct page, for per-page work like rumour pools
+    shared_pages: dict  # canonical URL -> topic keys, for pages more than one key points at
+    version: tuple
+
+
+def validate(raw_index: dict, raw_aliases: dict) -> tuple:
+    # -> (topics, aliases, problems). Fixable issues are fixed; broken entries are dropped.
+    problems = []
+    topics = {}
+    for key, url in raw_index.items():
+        if not isinstance(key, str) or not isinstance(url, str):
+            problems.append(f"dropped {key!r}: key and URL must both be strings")
+            continue
+        clean_key = " ".join(key.lower().split())
+        clean_url = url.strip()
+        if clean_url != url:
+            problems.append(f"trimmed whitespace around the URL for {clean_key!r}")
+        parsed = urlparse(clean_url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            problems.append(f"dropped {clean_key!r}: {clean_url!r} isn't a web URL")
+            continue
+        if clean_key in topics:
+            problems.append(f"{clean_key!r} is listed twice, keeping the last URL")
+        topics[clean_key] = clean_url
+
+    aliases = {}
+    for alias, key in raw_aliases.items():
+        key = " ".join(str(key).lower().split())
+        if key in topics:
+            aliases[" ".join(alias.lower().split())] = key
+        else:
+            problems.append(f"dropped alias {alias!r}: no topic {key!r}")
+    return topics, aliases, problems
+
+
+def build_index(raw_index: dict, raw_aliases: dict, version=None) -> tuple:
+    topics, aliases, problems = validate(raw_index, raw_aliases)
+    by_page = defaultdict(list)
+    for key, url in topics.items():
+        by_page[canonical_url(url)].append(key)
+    index = LoreIndex(
+        topics=topics,
+        aliases=aliases,
+        matcher=TopicMatcher.from_index(topics, aliases),
+        page_topics=[keys[0] for keys in by_page.values()],
+        shared_pages={url: keys for url, keys in by_page.items() if len(keys) > 1},
+        version=version,
+    )
+    return index, problems
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+class LoreIndexWatcher:
+    def __init__(self, index_path=LORE_INDEX_FILE, aliases_path=ALIASES_FILE):
+        self.index_path = index_path
+        self.aliases_path = aliases_path
+        self.current = None
+        self._rejected = None  # version of the last file we couldn't use, so it's reported once
+        self._listeners = []
+        self._lock = asyncio.Lock()
+
+    def _version(self):
+        return _file_version(self.index_path), _file_version(self.aliases_path)
+
+    def _build(self, version):
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            raw_index = json.load(f)
+        raw_aliases = {}
+        if version[1] is not None:
+            with open(self.aliases_path, "r", encoding="utf-8") as f:
+                raw_aliases = json.load(f)
+        if not isinstance(raw_index, dict) or not isinstance(raw_aliases, dict):
+            raise ValueError("lore index and aliases must both be JSON objects")
+        index, problems = build_index(raw_index, raw_aliases, version)
+        if not index.topics:
+            raise ValueError("no usable topics")
+        for problem in problems:
+            print(f"⚠️ Lore index: {problem}")
+        for url, keys in index.shared_pages.items():
+            print(f"📚 Lore index: {', '.join(keys)} share one page ({url})")
+        return index
+
+    def load(self) -> LoreIndex:
+        # Startup: a broken index here should stop the bot, not be papered over.
+        self.current = self._build(self._version())
+        return self.current
+
+    def on_swap(self, listener):
+        self._listeners.append(listener)
+        return listener
+
+    async def check(self) -> bool:
+        # Cheap stats on every tick; the parse and the matcher build happen in a thread.
+        version = self._version()
+        if version == self._rejected or (self.current is not None and version == self.current.version):
+            return False
+        async with self._lock:
+            if self.current is not None and version == self.current.version:
+                return False
+            try:
+                index = await asyncio.to_thread(self._build, version)
+            except (OSError, ValueError) as e:
+                # Half-saved or invalid file: keep serving the last good index.
+                print(f"⚠️ Lore index not reloaded: {e}")
+                self._rejected = version
+                return False
+            added = index.topics.keys() - self.current.topics.keys() if self.current else index.topics.keys()
+            removed = self.current.topics.keys() - index.topics.keys() if self.current else set()
+            self.current = index
+            for listener in self._listeners:
+                listener(index)
+            print(f"📚 Lore index reloaded: {len(index.topics)} topics (+{len(added)} / -{len(removed)})")
+            return True
+
+
+lore_watcher = LoreIndexWatcher()
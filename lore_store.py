@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import NamedTuple
+from urllib.parse import unquote_plus
+
+# 🔹 Precompiled lore: crawler output boiled down to clean paragraphs per page,
+# looked up by URL, so commands never touch the network or parse HTML.
+STORE_FILE = "lore.db"
+CRAWL_STATE_FILE = "crawl_state.json"
+LORE_INDEX_FILE = "lore_index.json"
+MIN_PARAGRAPH_LENGTH = 50
+
+
+class LoreEntry(NamedTuple):
+    title: str
+    url: str
+    paragraphs: list
+    status: int = 200
+
+
+def canonical_url(url: str) -> str:
+    # lore_index.json and crawled links disagree on quoting and trailing slashes.
+    return unquote_plus(url.strip()).rstrip("/")
+
+
+def clean_paragraphs(text: str) -> list:
+    paragraphs = []
+    seen = set()
+    for line in text.split("\n"):
+        line = " ".join(line.split())
+        if len(line) > MIN_PARAGRAPH_LENGTH and line not in seen:
+            seen.add(line)
+            paragraphs.append(line)
+    return paragraphs
+
+
+def compile_store(pages: dict, lore_index: dict, path=STORE_FILE):
+    # Build into a temp file and swap it in, so a running bot never reads a half-written store.
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    db.executescript(
+        """
+        CREATE TABLE pages (url TEXT PRIMARY KEY, title TEXT, hash TEXT, paragraphs TEXT);
+        """
+    )
+    db.executemany(
+        "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+        (
+            (canonical_url(url), page["title"].strip(), page.get("hash"), json.dumps(clean_paragraphs(page["text"])))
+            for url, page in pages.items()
+        ),
+    )
+    db.commit()
+    db.close()
+    os.replace(tmp, path)
+    # Topics map to pages through lore_index.json at lookup time; here they only
+    # tell us which index entries the crawl never reached.
+    crawled = {canonical_url(url) for url in pages}
+    missing = [key.lower() for key, url in lore_index.items() if canonical_url(url) not in crawled]
+    if missing:
+        print(f"⚠️ No crawled page for: {', '.join(missing)}")
+    return len(pages)
+
+
+class LoreStore:
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.version = None
+        self._db = None
+        self._pages = {}
+        # Handlers read on the event loop while retrieval rebuilds in a thread;
+        # nobody may close the connection out from under a query in progress.
+        self._lock = threading.Lock()
+
+    def _open(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _connect(self):
+        # A fresh crawl replaces the file, so reopen whenever its mtime moves. Callers hold _lock.
+        try:
+            version = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if version != self.version:
+            if self._db is not None:
+                self._db.close()
+            self._db = self._open()
+            self._pages = {}
+            self.version = version
+        return self._db
+
+    def get_page(self, url: str):
+        # By URL rather than topic, so topics added to the index since the last
+        # compile still resolve as long as their page was crawled.
+        url = canonical_url(url)
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            if url in self._pages:
+                return self._pages[url]
+
+            row = db.execute("SELECT title, url, paragraphs FROM pages WHERE url = ?", (url,)).fetchone()
+            entry = LoreEntry(row[0], row[1], json.loads(row[2])) if row else None
+            self._pages[url] = entry
+            return entry
+
+    def current_version(self):
+        with self._lock:
+            self._connect()
+            return self.version
+
+    def all_pages(self) -> list:
+        # Runs in a worker thread, so it reads through its own connection
+        # rather than holding the lock (and the handlers) for a full scan.
+        try:
+            db = self._open()
+        except sqlite3.OperationalError:  # no store compiled yet
+            return []
+        try:
+            rows = db.execute("SELECT url, title, hash, paragraphs FROM pages").fetchall()
+        finally:
+            db.close()
+        return [(url, title, digest, json.loads(paragraphs)) for url, title, digest, paragraphs in rows]
+
+
+lore_store = LoreStore()
+
+
+if __name__ == "__main__":
+    with open(CRAWL_STATE_FILE, "r", encoding="utf-8") as f:
+        crawled = json.load(f)["pages"]
+    with open(LORE_INDEX_FILE, "r") as f:
+        index = json.load(f)
+    count = compile_store(crawled, index)
+    print(f"Compiled {count} pages into {STORE_FILE}")
@@ -1,51 +1,221 @@
+import time
+STARTED = time.perf_counter()
+
 import os
+import sys
 import json
 import random
-import requests
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
 import discord
 from discord import File, app_commands
 from discord.ext import commands
-from openai import OpenAI
 from dotenv import load_dotenv
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from keep_alive import keep_alive
-
-# 🔹 Keep the bot alive with a ping server
-keep_alive()
-
-# 🔹 Load lore index from local file
-with open("lore_index.json", "r") as file:
-    LORE_INDEX = json.load(file)
-
-def fetch_lore_from_index(topic: str) -> str:
+from keep_alive import HealthServer
+from extract import extract_async
+from lore_client import lore_client
+from lore_store import LoreEntry, canonical_url, clean_paragraphs, lore_store
+from lore_index import WATCH_INTERVAL, lore_watcher
+from retrieval import format_passages, retrieval_index
+from response_cache import make_key, response_cache
+from content_pool import NAME_PLACEHOLDER, content_pools, fill_name
+from streaming import EMPTY_REPLY, STREAM_REPLIES, stream_reply
+from song_library import format_duration, song_library
+from guild_config import guild_configs
+from admission import CHEAP, EXPENSIVE, Rejected, admission
+from conversation import ConversationMemory
+from resilience import LLMGuard, Unavailable
+from fallback import LocalFallback
+from metrics import StartupTimer, instrumented, metrics, record_error, span
+from llm import CompletionService
+
+# 🔹 Startup timing: imports, lore load, command setup, login and ready.
+# openai, lxml/bs4, numpy and apscheduler are imported lazily on first use.
+startup = StartupTimer(STARTED)
+startup.mark("imports")
+
+# 🔹 Load lore index from local file. It's hot-reloaded (see watch_lore), so
+# handlers take one snapshot with lore_watcher.current and use it throughout.
+lore_watcher.load()
+startup.mark("lore_load")
+
+async def get_lore_entry(topic: str, index):
+    # Served from the precompiled store; the network is only a fallback for
+    # pages the last crawl didn't cover (or before the first crawl).
+    url = index.topics[topic]
+    entry = lore_store.get_page(url)
+    if entry is not None:
+        return entry
+
+    page = await lore_client.fetch(url)
+    if page.status != 200:
+        return LoreEntry(topic, url, [], page.status)
+    parsed = await extract_async(url, page.text)
+    return LoreEntry(parsed.title, url, clean_paragraphs(parsed.text))
+
+async def fetch_lore_from_index(topic: str, index=None) -> str:
+    index = index or lore_watcher.current
     try:
         topic = topic.lower()
-        if topic in LORE_INDEX:
-            url = LORE_INDEX[topic]
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.text.strip()[:2000]
+        if topic in index.topics:
+            entry = await get_lore_entry(topic, index)
+            if entry.status == 200:
+                return "\n\n".join(entry.paragraphs)[:2000]
             else:
-                return f"(Couldn't load {topic} lore: {response.status_code})"
+                return f"(Couldn't load {topic} lore: {entry.status})"
         else:
             return f"(No entry found for '{topic}' in the lore index.)"
     except Exception as e:
         return f"(Error fetching lore: {e})"
 
+async def retrieve_lore(query: str, topics: list = (), index=None) -> str:
+    # Best-matching passages across the whole corpus, favouring the named topics' pages.
+    index = index or lore_watcher.current
+    await retrieval_index.refresh(lore_store)
+    passages = retrieval_index.search(query, boost_urls={canonical_url(index.topics[t]) for t in topics})
+    if passages:
+        return format_passages(passages)
+    if not topics:
+        return ""
+
+    # Several keys can share a page (nora/pearl/shelly), so fetch each page once.
+    by_url = {}
+    for topic in topics:
+        by_url.setdefault(canonical_url(index.topics[topic]), topic)
+    results = await asyncio.gather(*(fetch_lore_from_index(t, index) for t in by_url.values()))
+    found = [lore for lore in results if not lore.startswith("(")]
+    return "\n\n".join(found)[:2000] if found else results[0]
+
 # 🔹 Load tokens and secrets
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-DISCORD_CHANNEL_ID = 1385397409550565566
-GUILD_ID = 1383828857827758151  # Your server ID
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+DISCORD_CHANNEL_ID = 1385397409550565566  # the original tavern channel, seeded into guilds.db
+GUILD_ID = 1383828857827758151  # the original server; commands used to be registered only here
+COMMAND_HASH_FILE = os.getenv("COMMAND_HASH_FILE", ".command_tree_hash")
+LORE_CRAWL_HOURS = float(os.getenv("LORE_CRAWL_HOURS", "12"))  # 0 turns the scheduled re-crawl off
+
+llm = CompletionService(api_key=OPENAI_API_KEY)
+llm_guard = LLMGuard(llm)
+
+# 🔹 Per-channel memory for /askquintin; older turns are summarised when OpenAI is free
+SUMMARY_INSTRUCTIONS = (
+    "Summarise this tavern conversation as brief notes in at most 80 words. "
+    "Keep names, topics and anything Quintin claimed or promised. No dialogue."
+)
+
+async def summarise_conversation(summary: str, turns: list):
+    if not llm.idle or not llm_guard.healthy:
+        return None  # busy or struggling: the memory folds the turns locally instead
+    notes = "\n".join(f"{speaker}: {prompt}\nQuintin: {reply}" for speaker, prompt, reply, _ in turns)
+    return await llm.complete(SUMMARY_INSTRUCTIONS, f"Notes so far: {summary or '(none)'}\n\n{notes}")
+
+conversations = ConversationMemory(summarise=summarise_conversation)
+
+# 🔹 How long each command may reuse a cached reply (0 = always generate fresh)
+RESPONSE_CACHE_TTL = {
+    "askquintin": 6 * 60 * 60,
+    "investigate": 0,
+    "rumour": 0,
+    "gossip": 0,
+    "compliment": 0,
+    "insult": 0,
+}
+
+# 🔹 How long each command may wait, queueing included, for OpenAI (seconds) before Quintin answers from local fallbacks
+LLM_SLO = {
+    "askquintin": 12.0,
+    "investigate": 12.0,
+    "rumour": 6.0,
+    "gossip": 6.0,
+    "compliment": 5.0,
+    "insult": 5.0,
+}
+QUEUE_SHARE = 0.5  # of the SLO a command may spend waiting for admission
+
+# 🔹 Sharding: SHARD_COUNT/SHARD_IDS split the shards across processes, e.g.
+# SHARD_COUNT=4 SHARD_IDS=0-1 in one and SHARD_IDS=2-3 in another. Unset = Discord decides.
+def parse_shard_ids(value: str):
+    if not value:
+        return None
+    ids = []
+    for part in value.split(","):
+        start, _, end = part.strip().partition("-")
+        ids.extend(range(int(start), int(end or start) + 1))
+    return ids
+
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", ""))
 
 # 🔹 Discord bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
-scheduler = AsyncIOScheduler()
+bot = commands.AutoShardedBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+scheduler = None  # created in on_ready, see start_scheduler()
+
+# 🔹 Health/readiness server on the bot's own event loop
+health_server = HealthServer(bot, None, llm, llm_guard=llm_guard)
+
+async def setup_hook():
+    # Runs once the REST login has succeeded, before the gateway connects.
+    startup.mark("login")
+    guild_configs.seed(GUILD_ID, DISCORD_CHANNEL_ID)
+    await health_server.start()
+
+bot.setup_hook = setup_hook
+
+# 🔹 Background jobs, registered here and scheduled once the bot is up
+SCHEDULED_JOBS = []
+
+def every(**interval):
+    def register(job):
+        SCHEDULED_JOBS.append((job, interval))
+        return job
+    return register
+
+def start_scheduler():
+    global scheduler
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    scheduler = AsyncIOScheduler()
+    for job, interval in SCHEDULED_JOBS:
+        scheduler.add_job(job, "interval", **interval)
+    scheduler.start()
+    health_server.scheduler = scheduler
+
+# 🔹 Slash command sync, skipped when the command tree hasn't changed
+def command_tree_hash() -> str:
+    schema = sorted((cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands()), key=lambda c: c["name"])
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+def load_synced_hash() -> str:
+    try:
+        with open(COMMAND_HASH_FILE, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def save_synced_hash(tree_hash: str):
+    try:
+        with open(COMMAND_HASH_FILE, "w") as f:
+            f.write(tree_hash)
+    except OSError as e:
+        print(f"⚠️ Couldn't save command hash: {e}")
+
+async def sync_commands(force: bool = False) -> bool:
+    # Commands are global now; syncing an empty tree to the original guild
+    # removes the copies that used to be registered there.
+    tree_hash = command_tree_hash()
+    if not force and tree_hash == load_synced_hash():
+        return False
+    await bot.tree.sync()
+    try:
+        await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
+    except discord.HTTPException as e:
+        print(f"⚠️ Couldn't clear old guild commands: {e}")
+    save_synced_hash(tree_hash)
+    return True
 
 # 🔹 Idle tavern chatter
 status_messages = [
@@ -105,136 +275,416 @@ status_messages = [
     "*Quintin lights a lantern, then lowers its flame to a soft glow.*"
 ]
 
-@scheduler.scheduled_job("interval", minutes=60)
+# 🔹 The Lucky Griffon's menu
+FOOD_MENU = {
+    "stew": "*A bubbling cauldron of meat and vegetables, always hot, always slightly mysterious.*",
+    "bread": "*Thick-sliced, fresh from the oven. Served with herbed butter and a smirk.*",
+    "cheese": "*Aged and sharp, with a rind tough enough to stop a dagger.*",
+    "meat pie": "*Savory and flaky, with fillings that change daily (but are always tasty).*",
+    "roast boar": "*Crispy skin, juicy meat, and a glaze of apples and ale.*",
+    "fish chowder": "*Creamy and rich, with a hint of sea salt and stories.*",
+    "dragon sausage": "*Spicy. Real dragon? Probably not. You want some or not?*",
+    "mushroom risotto": "*Cooked with wild mushrooms from the Moonwood. Slightly magical.*",
+    "owlbear ribs": "*Smoky, tender, and probably illegal. Comes with napkins.*",
+    "tavern platter": "*A bit of everything. For the indecisive or the drunk.*"
+}
+
+DRINK_MENU = {
+    "ale": "*Foamy and dark, brewed right here. One mug is plenty. Two is... ambitious.*",
+    "wine": "*A red so dry it might judge you for ordering it.*",
+    "mead": "*Sticky, golden, and makes your teeth feel warm.*",
+    "water": "*Cold and clean. Quintin still raises an eyebrow.*",
+    "mulled cider": "*Spiced with cinnamon, clove, and subtle hints of regret.*",
+    "dwarven stout": "*Strong enough to floor a Goliath. Served in small cups for safety.*",
+    "elven nectar": "*Light, floral, and makes you think of forests you'll never see.*",
+    "firewhiskey": "*Burns like betrayal. Goes down smooth.*",
+    "ghost grog": "*Chilled by spirits. Literally.*",
+    "wyrmshot": "*A tiny vial of something green. Glows. Quintin won't tell you what's in it.*"
+}
+
+# 🔹 Local, in-character replies for when OpenAI is slow or down (see resilience.py)
+def cached_lore(topic=None) -> list:
+    # Paragraphs already in the lore store, never the network: the topic's page, or any page.
+    index = lore_watcher.current
+    if topic in index.topics:
+        topics = [topic]
+    else:
+        topics = random.sample(index.page_topics, min(5, len(index.page_topics)))
+    for key in topics:
+        entry = lore_store.get_page(index.topics[key])
+        if entry is not None and entry.paragraphs:
+            return entry.paragraphs
+    return []
+
+fallback = LocalFallback(status_messages, FOOD_MENU, DRINK_MENU, lore=cached_lore)
+
+@every(minutes=60)
 async def tavern_ambience():
-    channel = bot.get_channel(DISCORD_CHANNEL_ID)
-    if channel:
-        await channel.send(random.choice(status_messages))
+    # get_channel only sees this process's shards, so each process covers its own guilds.
+    for config in guild_configs.all():
+        channel = bot.get_channel(config.ambience_channel) if config.ambience_channel else None
+        if channel:
+            try:
+                await channel.send(random.choice(status_messages))
+            except discord.HTTPException as e:
+                print(f"⚠️ Couldn't send ambience to guild {config.guild_id}: {e}")
+
+# 🔹 Generators shared by the commands and the background content pools
+RUMOUR_INSTRUCTIONS = (
+    "You are wise and slightly gruff. A customer has asked for a whispered rumour. "
+    "Based on the lore I give you, invent a rumour that sounds half-believable, dramatic, or eerie. "
+    "Make it short (1–2 sentences), and make sure it feels tied to Sordia Vignti's world."
+)
+GOSSIP_INSTRUCTIONS = (
+    "In a warm, whispery tone, share a rumour you've heard from your patrons. "
+    "It should sound like juicy tavern gossip, mysterious or mildly absurd, and relate to the world of Sordia Vignti — "
+    "including Kalteo, Alexandria, Big Tony, Zargathax, Ellette, Graxen, Qwimby, Steve Emberfoot, kyo, orlan, or any known figures or places from that world. "
+    "Keep it under 2 sentences, and deliver it as if you're leaning in conspiratorially."
+)
+BATCH_LORE_CHARS = 600  # lore per topic when several rumours share one prompt
+
+def compliment_instructions(name: str) -> str:
+    return (
+        f"You're warm, witty, and charming. Give a unique and funny compliment to the adventurer {name}. "
+        f"Use old-timey, tavern-style flair, like something you'd say while pouring a drink."
+    )
+
+def insult_instructions(name: str) -> str:
+    return (
+        f"You're sarcastic but never cruel. Roast the adventurer {name} with dry wit, "
+        f"like a grumpy tavern keeper who's seen too much. Keep it humorous and lighthearted."
+    )
+
+async def generate_rumour(topic: str) -> str:
+    lore = await fetch_lore_from_index(topic)
+
+    if lore.startswith("("):  # handle fetch issues
+        lore = "No real knowledge survives on this, only whispers and lies."
+
+    return await llm.complete(RUMOUR_INSTRUCTIONS, f"Lore about {topic}:\n{lore}\n\nWhat’s the rumour?")
+
+async def generate_gossip(_=None) -> str:
+    return await llm.complete(GOSSIP_INSTRUCTIONS)
+
+async def generate_compliment(name: str) -> str:
+    return await llm.complete(compliment_instructions(name))
+
+async def generate_insult(name: str) -> str:
+    return await llm.complete(insult_instructions(name))
+
+# Batched variants: one call returns `count` items as (pool key, text) pairs.
+async def generate_rumour_batch(topics: list, count: int) -> list:
+    lore = await asyncio.gather(*(fetch_lore_from_index(topic) for topic in topics))
+    notes = "\n\n".join(
+        f"Lore about {topic}:\n{text[:BATCH_LORE_CHARS]}"
+        for topic, text in zip(topics, lore) if not text.startswith("(")
+    )
+    items = await llm.complete_items(
+        RUMOUR_INSTRUCTIONS,
+        f"{notes}\n\nWrite {count} different rumours, spread across these topics: {', '.join(topics)}. "
+        "Put the topic name, exactly as written, in each item's \"topic\" field.",
+        count,
+        keys=("topic", "text"),
+    )
+    return [(item["topic"].lower(), item["text"]) for item in items if item["topic"].lower() in topics]
+
+async def generate_gossip_batch(_, count: int) -> list:
+    items = await llm.complete_items(GOSSIP_INSTRUCTIONS, f"Share {count} different pieces of gossip.", count)
+    return [(None, item["text"]) for item in items]
+
+async def generate_template_batch(instructions, count: int) -> list:
+    items = await llm.complete_items(instructions, f"Write {count} different ones.", count)
+    return [(None, item["text"]) for item in items]
+
+# Compliments and roasts are pooled as templates and get the real name filled in later.
+# One rumour pool per lore page; keys sharing a page (the hags, say) share its pool.
+content_pools.register(
+    "rumour", generate_rumour, keys=lore_watcher.current.page_topics, size=1, generate_batch=generate_rumour_batch
+)
+lore_watcher.on_swap(lambda index: content_pools.set_keys("rumour", index.page_topics))
+content_pools.register("gossip", generate_gossip, size=5, generate_batch=generate_gossip_batch)
+content_pools.register(
+    "compliment",
+    lambda _: generate_compliment(NAME_PLACEHOLDER),
+    size=5,
+    generate_batch=lambda _, count: generate_template_batch(compliment_instructions(NAME_PLACEHOLDER), count),
+)
+content_pools.register(
+    "insult",
+    lambda _: generate_insult(NAME_PLACEHOLDER),
+    size=5,
+    generate_batch=lambda _, count: generate_template_batch(insult_instructions(NAME_PLACEHOLDER), count),
+)
+
+@every(seconds=WATCH_INTERVAL)
+async def watch_lore():
+    # Picks up edits to lore_index.json / lore_aliases.json and a freshly compiled
+    # lore.db; both rebuild in a thread and swap in whole.
+    await lore_watcher.check()
+    await retrieval_index.refresh(lore_store)
+
+async def recrawl_lore():
+    # The deploy build crawls once; this keeps lore.db current as the wiki changes.
+    # It's incremental (304s for unchanged pages) and runs in its own process,
+    # and watch_lore hot-loads the store it writes.
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "crawler.py", cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+    )
+    output, _ = await process.communicate()
+    lines = output.decode(errors="replace").strip().splitlines()
+    if process.returncode == 0:
+        print(f"📚 {lines[-1] if lines else 'Lore crawl finished.'}")
+    else:
+        print(f"⚠️ Lore crawl failed (exit {process.returncode}): {lines[-1] if lines else 'no output'}")
+
+if LORE_CRAWL_HOURS > 0:
+    every(hours=LORE_CRAWL_HOURS)(recrawl_lore)
+
+@every(minutes=5)
+async def forget_quiet_channels():
+    conversations.evict_idle()
+    stats = conversations.stats()
+    metrics.set("quintin_memory_channels", stats["channels"])
+    metrics.set("quintin_memory_tokens", stats["tokens"])
+
+@every(seconds=30)
+async def refill_content_pools():
+    # Only spend OpenAI time when no one is waiting on it.
+    made = await content_pools.refill(is_idle=lambda: llm.idle and llm_guard.healthy)
+    if made:
+        print(f"🍲 Topped up {made} pooled lines: {content_pools.summary()}")
 
 @bot.event
 async def on_ready():
+    # on_ready fires again on every reconnect; only the first one is startup.
+    first_ready = scheduler is None
     try:
-        guild = discord.Object(id=GUILD_ID)
+        # Re-sync global commands only when their definitions changed (/sync forces it)
+        shards = f"{len(bot.shards)} shard(s), {len(bot.guilds)} guild(s)"
+        if await sync_commands():
+            print(f"🍻 Quintin is ready on {shards}. Synced slash commands.")
+        else:
+            print(f"🍻 Quintin is ready on {shards}. Slash commands unchanged, skipped sync.")
+    except Exception as e:
+        print(f"❌ Slash command sync failed: {e}")
 
-        # Clear global commands to prevent ghost commands
-       # await bot.tree.clear_commands()
-       # await bot.tree.sync()  # This syncs nothing globally
+    # Start the scheduler now that the event loop is running!
+    if first_ready:
+        start_scheduler()
+        startup.mark("ready")
+        print(startup.report())
 
-        # Clear and re-sync guild commands only
-        #await bot.tree.clear_commands(guild=guild)
-        await bot.tree.sync(guild=guild)
-        
-        # Start the scheduler now that the event loop is running!
-        if not scheduler.running:
-            scheduler.start()
 
-        print(f"🍻 Quintin is ready. Synced slash commands for guild {GUILD_ID}.")
-    except Exception as e:
-        print(f"❌ Slash command sync failed: {e}")
+# 🔹 Shared handler steps, each timed as its own span for /metrics
+async def in_tavern(interaction: discord.Interaction, refusal: str) -> bool:
+    with span("channel_check"):
+        if guild_configs.allows(interaction.guild_id, interaction.channel_id):
+            return True
+        await interaction.response.send_message(refusal, ephemeral=True)
+        return False
+
+async def defer(interaction: discord.Interaction):
+    with span("defer"):
+        await interaction.response.defer()
+
+async def send(interaction: discord.Interaction, *args, **kwargs):
+    with span("send"):
+        return await interaction.followup.send(*args, **kwargs)
+
+# 🔹 Admission control: every LLM call from a command goes through here
+TURNED_AWAY = {
+    "user_rate": "Quintin holds up a hand. 'Easy, friend — one tale at a time. Let the others get a word in.'",
+    "guild_rate": "Quintin wipes his brow. 'The whole tavern's shouting at once. Give me a moment to catch up.'",
+    "overloaded": "Quintin is run off his feet, mugs in both hands. 'Packed tonight, friend. Ask me again in a bit.'",
+}
+
+def admit(interaction: discord.Interaction, priority=CHEAP, max_wait=None):
+    command = interaction.command.name if interaction.command else "unknown"
+    return admission.admit(interaction.user.id, interaction.guild_id, command, priority, max_wait)
+
+# 🔹 Bounded LLM calls: within the command's SLO (hedged if slow), else a local fallback
+def fell_back(command: str, error: Unavailable):
+    metrics.inc("quintin_llm_fallback_total", command=command, reason=error.reason)
+
+@asynccontextmanager
+async def llm_slot(interaction: discord.Interaction, command: str, priority=CHEAP):
+    # The command's SLO covers queueing too: with the circuit open there's no
+    # queueing at all, and a slot that doesn't come within QUEUE_SHARE of the
+    # SLO is given up for the local fallback. Yields the seconds left for the call.
+    slo = LLM_SLO.get(command, llm_guard.default_slo)
+    started = time.monotonic()
+    llm_guard.check(command)
+    try:
+        async with admit(interaction, priority, max_wait=slo * QUEUE_SHARE):
+            yield slo - (time.monotonic() - started)
+    except Rejected as e:
+        if e.reason == "timeout":
+            raise Unavailable("slow") from None
+        raise
+
+async def generate(interaction: discord.Interaction, make_call, local_reply, priority=CHEAP) -> str:
+    command = interaction.command.name
+    try:
+        async with llm_slot(interaction, command, priority) as slo:
+            with span("llm"):
+                return await llm_guard.call(command, make_call, slo)
+    except Unavailable as e:
+        fell_back(command, e)
+        return local_reply()
+
+def with_guild_persona(interaction: discord.Interaction, instructions: str) -> str:
+    persona = guild_configs.get(interaction.guild_id).persona if interaction.guild_id else ""
+    return f"{persona}\n\n{instructions}" if persona else instructions
 
 
 # 🔹 Ask Quintin
-@bot.tree.command(name="askquintin", description="Ask Quintin, the barkeep, anything.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="askquintin", description="Ask Quintin, the barkeep, anything.")
+@instrumented
 async def askquintin(interaction: discord.Interaction, prompt: str):
     try:
-        if interaction.channel.id != DISCORD_CHANNEL_ID:
-            await interaction.response.send_message(
-                "Quintin wipes his hands and says, 'We only talk shop at the bar, friend.'",
-                ephemeral=True
-            )
+        if not await in_tavern(interaction, "Quintin wipes his hands and says, 'We only talk shop at the bar, friend.'"):
             return
 
-        await interaction.response.defer()
+        await defer(interaction)
 
-        topic_guess = next((word for word in prompt.lower().split() if word in LORE_INDEX), "")
-        lore = fetch_lore_from_index(topic_guess) if topic_guess else ""
+        with span("lore"):
+            index = lore_watcher.current
+            topics = index.matcher.find(prompt)
+            topic_names = ", ".join(topic.capitalize() for topic in topics)
+            lore = await retrieve_lore(prompt, topics, index)
 
         if lore.startswith("("):
             lore = (
-                f"Rumour has it, no one really knows the full story of {topic_guess.capitalize()}, "
+                f"Rumour has it, no one really knows the full story of {topic_names}, "
                 f"but the tavern regulars whisper they once did something truly legendary..."
             )
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are Quintin, the barkeep of the Lucky Griffon in Alexandria. "
-                        "You speak with dry humour and warmth, and never break character. "
-                        "You serve stew, gossip, and wisdom to adventurers.\n\n"
-                        f"Here is what you know about {topic_guess or 'this matter'}:\n{lore}"
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ]
+        # Follow-ups see the channel's recent exchanges plus a summary of older ones.
+        summary, history = conversations.history(interaction.channel_id)
+        speaker = interaction.user.display_name
+        briefing = (
+            "You serve stew, gossip, and wisdom to adventurers.\n\n"
+            f"Here is what you know about {topic_names or 'this matter'}:\n{lore}"
         )
+        instructions = with_guild_persona(
+            interaction, briefing + (f"\n\nEarlier in this conversation: {summary}" if summary else "")
+        )
+        # Keyed on the prompt, topics, lore and guild persona but not the conversation, so a
+        # repeat question hits mid-conversation too. A prompt that names no topic while a
+        # conversation is going is a follow-up ("what about his brother?") and skips the cache,
+        # and only replies written without any conversation behind them are stored. Those are
+        # also written without the asker's name, so a cached reply never addresses someone else.
+        fresh = not (history or summary)
+        follow_up = not fresh and not topics
+        message = prompt if fresh else f"{speaker}: {prompt}"
+        cache_key = make_key("askquintin", prompt, topics, with_guild_persona(interaction, briefing))
+        cache_ttl = 0 if follow_up else RESPONSE_CACHE_TTL["askquintin"]
+
+        reply = response_cache.get(cache_key, cache_ttl) if cache_ttl > 0 else None
+        if reply is not None:
+            await send(interaction, reply)
+            conversations.remember(interaction.channel_id, speaker, prompt, reply)
+            return
 
-        reply = response.choices[0].message.content
-        await interaction.followup.send(reply)
-
+        # A lore-heavy prompt, so it queues behind the cheap commands.
+        try:
+            async with llm_slot(interaction, "askquintin", EXPENSIVE) as slo:
+                if STREAM_REPLIES:
+                    # Streaming interleaves generation with message edits, so it's one span.
+                    with span("llm"):
+                        deltas = llm_guard.stream(
+                            "askquintin",
+                            lambda: llm.stream(instructions, message, history=history),
+                            slo,
+                        )
+                        reply = await stream_reply(interaction.followup, deltas)
+                else:
+                    with span("llm"):
+                        reply = await llm_guard.call(
+                            "askquintin",
+                            lambda: llm.complete(instructions, message, history=history),
+                            slo,
+                        )
+        except Unavailable as e:
+            # Not remembered or cached: the next ask should get the real Quintin.
+            fell_back("askquintin", e)
+            await send(interaction, fallback.answer(topic_names, lore))
+            return
+        if not STREAM_REPLIES:
+            await send(interaction, reply or EMPTY_REPLY)
+        if not reply.strip():
+            return  # nothing worth remembering or serving again
+        conversations.remember(interaction.channel_id, speaker, prompt, reply)
+        if cache_ttl > 0 and fresh:
+            response_cache.put(cache_key, reply)
+
+    except Rejected as e:
+        await send(interaction, TURNED_AWAY[e.reason])
     except Exception as e:
         import traceback
         traceback.print_exc()
-        await interaction.followup.send(f"❌ Quintin dropped his mug: `{e}`")
+        record_error(e)
+        await send(interaction, "❌ Quintin dropped his mug. 'Give me a moment to mop up, friend, then ask again.'")
 
 # 🔹 Sing command
-@bot.tree.command(name="sing", description="Ask Quintin to sing a tavern song.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="sing", description="Ask Quintin to sing a tavern song.")
+@instrumented
 async def sing(interaction: discord.Interaction):
-    if interaction.channel.id != DISCORD_CHANNEL_ID:
-        await interaction.response.send_message(
-            "Quintin grumbles, 'I only sing in the tavern, friend.'",
-            ephemeral=True
-        )
+    if not await in_tavern(interaction, "Quintin grumbles, 'I only sing in the tavern, friend.'"):
         return
 
-    song_folder = "assets"
-    song_files = [f for f in os.listdir(song_folder) if f.endswith((".mp3", ".wav"))]
+    # The songbook only rescans assets/ when the folder changes.
+    with span("songbook"):
+        song = await asyncio.to_thread(song_library.pick)
 
-    if not song_files:
+    if song is None:
         await interaction.response.send_message(
             "Quintin scratches his head. 'No songs left in the book tonight, friend.'"
         )
         return
 
-    chosen_song = random.choice(song_files)
-    file_path = os.path.join(song_folder, chosen_song)
-    song_title = os.path.splitext(chosen_song)[0].replace("_", " ").title()
+    duration = format_duration(song.duration)
+    content = f"*Quintin clears his throat and begins to sing:* 🎵 **{song.title}**" + (f" ({duration})" if duration else "")
 
-    await interaction.response.send_message(
-        content=f"*Quintin clears his throat and begins to sing:* 🎵 **{song_title}**",
-        file=File(file_path)
-    )
+    # Played before: link the earlier upload instead of sending the file again.
+    url = song_library.cached_url(song)
+    if url:
+        with span("send"):
+            await interaction.response.send_message(content=f"{content}\n{url}")
+        return
+
+    # The transcode can outlast the 3s interaction window, so defer first.
+    await defer(interaction)
+    with span("transcode"):
+        file_path = await song_library.upload_path(song)
+    message = await send(interaction, content=content, file=File(file_path), wait=True)
+    if message.attachments:
+        song_library.remember_upload(song, message.attachments[0].url)
 
 # 🔹 List Commands
-@bot.tree.command(name="listcommands", description="Lists all registered commands.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="listcommands", description="Lists all registered commands.")
+@instrumented
 async def list_commands(interaction: discord.Interaction):
-    cmds = [cmd.name for cmd in bot.tree.get_commands(guild=discord.Object(id=GUILD_ID))]
+    cmds = [cmd.name for cmd in bot.tree.get_commands()]
     await interaction.response.send_message(f"Registered commands: {', '.join(cmds)}")
 
-from bs4 import BeautifulSoup  # Make sure this is in your imports
-
-@bot.tree.command(name="who", description="Ask Quintin about someone from the world.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="who", description="Ask Quintin about someone from the world.")
+@instrumented
 async def who(interaction: discord.Interaction, name: str):
-    if interaction.channel.id != DISCORD_CHANNEL_ID:
-        await interaction.response.send_message(
-            "Quintin raises an eyebrow. 'Only regulars get to ask about folks, friend.'",
-            ephemeral=True
-        )
+    if not await in_tavern(interaction, "Quintin raises an eyebrow. 'Only regulars get to ask about folks, friend.'"):
         return
 
-    await interaction.response.defer()
+    await defer(interaction)
 
     try:
-        name_key = name.lower()
-        if name_key in LORE_INDEX:
-            url = LORE_INDEX[name_key]
-            response = requests.get(url)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, "html.parser")
-                content_text = soup.get_text(separator="\n").strip()
-                paragraphs = [p.strip() for p in content_text.split("\n") if len(p.strip()) > 50]
+        index = lore_watcher.current
+        name_key = index.aliases.get(name.lower().strip(), name.lower().strip())
+        if name_key in index.topics:
+            with span("lore"):
+                entry = await get_lore_entry(name_key, index)
+            if entry.status == 200:
+                paragraphs = entry.paragraphs
 
                 if not paragraphs:
                     lore = f"Quintin flips through the ledger. 'Strange, nothing here on {name.title()}.'"
@@ -242,75 +692,58 @@ async def who(interaction: discord.Interaction, name: str):
                     snippet = "\n\n".join(random.sample(paragraphs, min(2, len(paragraphs))))
                     lore = f"**About {name.title()}**\n{snippet[:2000]}"
             else:
-                lore = f"Quintin frowns. 'Trouble finding the records for {name.title()} – the ledger gave me a {response.status_code} error.'"
+                lore = f"Quintin frowns. 'Trouble finding the records for {name.title()} – the ledger gave me a {entry.status} error.'"
         else:
             lore = f"Quintin scratches his beard. 'Can’t say I know much about {name.title()}, but the name rings a bell…'"
 
-        await interaction.followup.send(lore)
+        await send(interaction, lore)
 
     except Exception as e:
         import traceback
         traceback.print_exc()
-        await interaction.followup.send(f"❌ Quintin dropped the ledger: `{e}`")
+        record_error(e)
+        await send(interaction, "❌ Quintin dropped the ledger, and the pages went everywhere. 'Ask me again in a moment.'")
 
 
-@bot.tree.command(name="rumour", description="Quintin shares a whispered rumour from the tavern.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="rumour", description="Quintin shares a whispered rumour from the tavern.")
+@instrumented
 async def rumour(interaction: discord.Interaction):
-    await interaction.response.defer()
+    await defer(interaction)
 
     try:
-        # Pick a random topic from your lore index
-        topic = random.choice(list(LORE_INDEX.keys()))
-        lore = fetch_lore_from_index(topic)
-
-        if lore.startswith("("):  # handle fetch issues
-            lore = "No real knowledge survives on this, only whispers and lies."
-
-        # Generate a rumour using OpenAI
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are Quintin, a wise and slightly gruff barkeep of the Lucky Griffon tavern in Alexandria. "
-                        "You speak in dry humour, always staying in character. A customer has asked for a whispered rumour. "
-                        "Based on the lore I give you, invent a rumour that sounds half-believable, dramatic, or eerie. "
-                        "Make it short (1–2 sentences), and make sure it feels tied to Sordia Vignti's world."
-                    )
-                },
-                {"role": "user", "content": f"Lore about {topic}:\n{lore}\n\nWhat’s the rumour?"}
-            ]
-        )
-
-        rumour_text = response.choices[0].message.content.strip()
+        # A pre-made rumour about a random topic if we have one, else make one now
+        _, rumour_text = content_pools.take_any("rumour")
+        if rumour_text is None:
+            topic = random.choice(lore_watcher.current.page_topics)
+            rumour_text = await generate(interaction, lambda: generate_rumour(topic), lambda: fallback.rumour(topic))
 
-        await interaction.followup.send(f"*Quintin leans in and murmurs:*\n> {rumour_text}")
+        await send(interaction, f"*Quintin leans in and murmurs:*\n> {rumour_text}")
 
+    except Rejected as e:
+        await send(interaction, TURNED_AWAY[e.reason])
     except Exception as e:
         import traceback
         traceback.print_exc()
-        await interaction.followup.send("❌ Quintin burned the stew trying to remember that rumour.")
+        record_error(e)
+        await send(interaction, "❌ Quintin burned the stew trying to remember that rumour.")
 
 import random
 
-@bot.tree.command(name="investigate", description="Ask Quintin to dig into a rumour or mystery.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="investigate", description="Ask Quintin to dig into a rumour or mystery.")
+@instrumented
 async def investigate(interaction: discord.Interaction, topic: str):
-    if interaction.channel.id != DISCORD_CHANNEL_ID:
-        await interaction.response.send_message(
-            "Quintin leans in and mutters, 'Can't go spreading suspicions outside the tavern.'",
-            ephemeral=True
-        )
+    if not await in_tavern(interaction, "Quintin leans in and mutters, 'Can't go spreading suspicions outside the tavern.'"):
         return
 
-    await interaction.response.defer()
+    await defer(interaction)
 
     # Roll a d20 to determine investigation quality
     roll = random.randint(1, 20)
 
     # Try to identify known lore
-    topic_guess = next((word for word in topic.lower().split() if word in LORE_INDEX), "")
-    lore = fetch_lore_from_index(topic_guess) if topic_guess else ""
+    with span("lore"):
+        index = lore_watcher.current
+        lore = await retrieve_lore(topic, index.matcher.find(topic), index)
 
     # Vary the tone based on the roll
     if roll == 1:
@@ -327,71 +760,53 @@ async def investigate(interaction: discord.Interaction, topic: str):
         clue_intro = f"Quintin wipes his hands and speaks low. 'I risked a lot pulling this thread on *{topic}*—listen closely.'"
 
     # Prompt for GPT response
+    known = "Known info:\n" + lore if lore else "You don’t know much directly, but whispers abound."
     prompt = (
-        f"You are Quintin, a barkeep informant. You just rolled a {roll} on a D&D-style investigation check.\n"
+        f"You are acting as a barkeep informant. You just rolled a {roll} on a D&D-style investigation check.\n"
         f"The topic was: '{topic}'.\n"
-        f"{'Known info:\n' + lore if lore else 'You don’t know much directly, but whispers abound.'}\n"
+        f"{known}\n"
         f"Respond with a flavourful rumour, lead, or clue based on the roll result."
     )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are Quintin, barkeep of the Lucky Griffon. You're dry, witty, and know more than you let on."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        clue = response.choices[0].message.content
-        await interaction.followup.send(f"🎲 *Quintin rolled a {roll} on his investigation.*\n{clue_intro}\n\n{clue}")
+        header = f"🎲 *Quintin rolled a {roll} on his investigation.*\n{clue_intro}\n\n"
+        instructions = with_guild_persona(interaction, "You're witty, and know more than you let on.")
+        try:
+            async with llm_slot(interaction, "investigate", EXPENSIVE) as slo:
+                if STREAM_REPLIES:
+                    with span("llm"):
+                        deltas = llm_guard.stream("investigate", lambda: llm.stream(instructions, prompt), slo)
+                        await stream_reply(interaction.followup, deltas, prefix=header)
+                else:
+                    with span("llm"):
+                        clue = await llm_guard.call("investigate", lambda: llm.complete(instructions, prompt), slo)
+        except Unavailable as e:
+            fell_back("investigate", e)
+            await send(interaction, f"{header}{fallback.clue(topic, lore)}")
+            return
+        if not STREAM_REPLIES:
+            await send(interaction, f"{header}{clue or EMPTY_REPLY}")
+    except Rejected as e:
+        await send(interaction, TURNED_AWAY[e.reason])
     except Exception as e:
-        await interaction.followup.send(f"Quintin groans. 'Something went wrong with my digging: `{e}`'")
+        record_error(e)
+        await send(interaction, "Quintin groans. 'Lost the thread on that one, friend. Try me again shortly.'")
 
-@bot.tree.command(name="menu", description="Order food or drinks from the Lucky Griffon.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="menu", description="Order food or drinks from the Lucky Griffon.")
 @app_commands.describe(item="What would you like to order?")
+@instrumented
 async def menu(interaction: discord.Interaction, item: str):
-    if interaction.channel.id != DISCORD_CHANNEL_ID:
-        await interaction.response.send_message(
-            "Quintin raises an eyebrow. 'We don’t serve out on the street, friend.'",
-            ephemeral=True
-        )
+    if not await in_tavern(interaction, "Quintin raises an eyebrow. 'We don’t serve out on the street, friend.'"):
         return
 
-    await interaction.response.defer()
-
-    # Expanded menu
-    food_menu = {
-        "stew": "*A bubbling cauldron of meat and vegetables, always hot, always slightly mysterious.*",
-        "bread": "*Thick-sliced, fresh from the oven. Served with herbed butter and a smirk.*",
-        "cheese": "*Aged and sharp, with a rind tough enough to stop a dagger.*",
-        "meat pie": "*Savory and flaky, with fillings that change daily (but are always tasty).*",
-        "roast boar": "*Crispy skin, juicy meat, and a glaze of apples and ale.*",
-        "fish chowder": "*Creamy and rich, with a hint of sea salt and stories.*",
-        "dragon sausage": "*Spicy. Real dragon? Probably not. You want some or not?*",
-        "mushroom risotto": "*Cooked with wild mushrooms from the Moonwood. Slightly magical.*",
-        "owlbear ribs": "*Smoky, tender, and probably illegal. Comes with napkins.*",
-        "tavern platter": "*A bit of everything. For the indecisive or the drunk.*"
-    }
-
-    drink_menu = {
-        "ale": "*Foamy and dark, brewed right here. One mug is plenty. Two is... ambitious.*",
-        "wine": "*A red so dry it might judge you for ordering it.*",
-        "mead": "*Sticky, golden, and makes your teeth feel warm.*",
-        "water": "*Cold and clean. Quintin still raises an eyebrow.*",
-        "mulled cider": "*Spiced with cinnamon, clove, and subtle hints of regret.*",
-        "dwarven stout": "*Strong enough to floor a Goliath. Served in small cups for safety.*",
-        "elven nectar": "*Light, floral, and makes you think of forests you'll never see.*",
-        "firewhiskey": "*Burns like betrayal. Goes down smooth.*",
-        "ghost grog": "*Chilled by spirits. Literally.*",
-        "wyrmshot": "*A tiny vial of something green. Glows. Quintin won't tell you what's in it.*"
-    }
+    await defer(interaction)
 
     item_lower = item.lower()
 
-    if item_lower in food_menu:
-        reply = f"🍽️ Quintin nods and serves you **{item.title()}**.\n{food_menu[item_lower]}"
-    elif item_lower in drink_menu:
-        reply = f"🍺 Quintin pours you a glass of **{item.title()}**.\n{drink_menu[item_lower]}"
+    if item_lower in FOOD_MENU:
+        reply = f"🍽️ Quintin nods and serves you **{item.title()}**.\n{FOOD_MENU[item_lower]}"
+    elif item_lower in DRINK_MENU:
+        reply = f"🍺 Quintin pours you a glass of **{item.title()}**.\n{DRINK_MENU[item_lower]}"
     elif item_lower in ("secret", "mystery", "special"):
         reply = (
             "*Quintin leans in, lowers his voice.*\n"
@@ -400,80 +815,130 @@ async def menu(interaction: discord.Interaction, item: str):
     else:
         reply = (
             f"Quintin blinks. 'Sorry friend, we don't serve *{item}*. Try something from the menu below.'\n\n"
-            f"**🍴 Food Available:** {', '.join(food_menu.keys())}\n"
-            f"**🍻 Drinks Available:** {', '.join(drink_menu.keys())}\n"
+            f"**🍴 Food Available:** {', '.join(FOOD_MENU.keys())}\n"
+            f"**🍻 Drinks Available:** {', '.join(DRINK_MENU.keys())}\n"
             f"_(Try ordering 'secret' if you're feeling lucky...)_"
         )
 
-    await interaction.followup.send(reply)
+    await send(interaction, reply)
 
-@bot.tree.command(name="gossip", description="Quintin shares some juicy, fresh tavern gossip.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="gossip", description="Quintin shares some juicy, fresh tavern gossip.")
+@instrumented
 async def gossip(interaction: discord.Interaction):
     try:
-        await interaction.response.defer()
-        
-        prompt = (
-            "You are Quintin, the barkeep of the Lucky Griffon in Alexandria. "
-            "In a warm, whispery tone, share a rumour you've heard from your patrons. "
-            "It should sound like juicy tavern gossip, mysterious or mildly absurd, and relate to the world of Sordia Vignti — "
-            "including Kalteo, Alexandria, Big Tony, Zargathax, Ellette, Graxen, Qwimby, Steve Emberfoot, kyo, orlan, or any known figures or places from that world. "
-            "Keep it under 2 sentences, and deliver it as if you're leaning in conspiratorially."
-        )
+        await defer(interaction)
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": prompt}]
-        )
-
-        rumour = response.choices[0].message.content.strip()
-        await interaction.followup.send(f"*Quintin leans in and whispers:*\n> {rumour}")
+        rumour = content_pools.take("gossip")
+        if rumour is None:
+            rumour = await generate(interaction, generate_gossip, fallback.gossip)
+        await send(interaction, f"*Quintin leans in and whispers:*\n> {rumour}")
 
+    except Rejected as e:
+        await send(interaction, TURNED_AWAY[e.reason])
     except Exception as e:
-        await interaction.followup.send(f"❌ Quintin spilled the stew instead of gossiping: `{e}`")
+        record_error(e)
+        await send(interaction, "❌ Quintin spilled the stew instead of gossiping. 'Give me a moment, friend.'")
 
-@bot.tree.command(name="compliment", description="Quintin gives someone a heartfelt (or odd) compliment.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="compliment", description="Quintin gives someone a heartfelt (or odd) compliment.")
+@instrumented
 async def compliment(interaction: discord.Interaction, user: discord.User):
-    await interaction.response.defer()
-    prompt = (
-        f"You're Quintin, the barkeep of the Lucky Griffon in Alexandria. "
-        f"You're warm, witty, and charming. Give a unique and funny compliment to the adventurer {user.name}. "
-        f"Use old-timey, tavern-style flair, like something you'd say while pouring a drink."
-    )
+    await defer(interaction)
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": prompt}]
-        )
-        reply = response.choices[0].message.content
-        await interaction.followup.send(f"{user.mention} {reply}")
+        template = content_pools.take("compliment")
+        if template:
+            reply = fill_name(template, user.name)
+        else:
+            reply = await generate(
+                interaction, lambda: generate_compliment(user.name), lambda: fallback.compliment(user.name)
+            )
+        await send(interaction, f"{user.mention} {reply}")
+    except Rejected as e:
+        await send(interaction, TURNED_AWAY[e.reason])
     except Exception as e:
-        await interaction.followup.send(f"❌ Quintin dropped the bottle: `{e}`")
+        record_error(e)
+        await send(interaction, "❌ Quintin dropped the bottle. 'Hold that thought, friend, and ask again.'")
 
 
-@bot.tree.command(name="insult", description="Quintin roasts someone, barkeep-style.", guild=discord.Object(id=GUILD_ID))
+@bot.tree.command(name="insult", description="Quintin roasts someone, barkeep-style.")
+@instrumented
 async def insult(interaction: discord.Interaction, user: discord.User):
-    await interaction.response.defer()
-    prompt = (
-        f"You're Quintin, the barkeep of the Lucky Griffon in Alexandria. "
-        f"You're sarcastic but never cruel. Roast the adventurer {user.name} with dry wit, "
-        f"like a grumpy tavern keeper who's seen too much. Keep it humorous and lighthearted."
-    )
+    await defer(interaction)
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": prompt}]
-        )
-        reply = response.choices[0].message.content
-        await interaction.followup.send(f"{user.mention} {reply}")
+        template = content_pools.take("insult")
+        if template:
+            reply = fill_name(template, user.name)
+        else:
+            reply = await generate(interaction, lambda: generate_insult(user.name), lambda: fallback.insult(user.name))
+        await send(interaction, f"{user.mention} {reply}")
+    except Rejected as e:
+        await send(interaction, TURNED_AWAY[e.reason])
     except Exception as e:
-        await interaction.followup.send(f"❌ Quintin choked on his own sass: `{e}`")
-
-@bot.tree.command(name="sync", description="Manually sync slash commands (admin only!)", guild=discord.Object(id=GUILD_ID))
+        record_error(e)
+        await send(interaction, "❌ Quintin choked on his own sass. 'Give me a moment, then try me again.'")
+
+# 🔹 Per-server setup: which channels are the tavern, where ambience goes, persona tweaks
+tavern_config = app_commands.Group(
+    name="tavern",
+    description="Set up Quintin's tavern for this server.",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True),
+)
+
+def describe_config(config) -> str:
+    channels = ", ".join(f"<#{c}>" for c in sorted(config.allowed_channels)) or "any channel"
+    ambience = f"<#{config.ambience_channel}>" if config.ambience_channel else "off"
+    persona = config.persona or "(none)"
+    return f"**Tavern channels:** {channels}\n**Ambience:** {ambience}\n**Persona tweak:** {persona}"
+
+@tavern_config.command(name="show", description="Show this server's tavern settings.")
+@instrumented
+async def tavern_show(interaction: discord.Interaction):
+    await interaction.response.send_message(describe_config(guild_configs.get(interaction.guild_id)), ephemeral=True)
+
+@tavern_config.command(name="allow", description="Let Quintin serve in a channel.")
+@instrumented
+async def tavern_allow(interaction: discord.Interaction, channel: discord.TextChannel):
+    config = guild_configs.get(interaction.guild_id)
+    config = guild_configs.update(interaction.guild_id, allowed_channels=config.allowed_channels | {channel.id})
+    await interaction.response.send_message(describe_config(config), ephemeral=True)
+
+@tavern_config.command(name="disallow", description="Stop Quintin serving in a channel.")
+@instrumented
+async def tavern_disallow(interaction: discord.Interaction, channel: discord.TextChannel):
+    config = guild_configs.get(interaction.guild_id)
+    config = guild_configs.update(interaction.guild_id, allowed_channels=config.allowed_channels - {channel.id})
+    await interaction.response.send_message(describe_config(config), ephemeral=True)
+
+@tavern_config.command(name="ambience", description="Where Quintin's idle chatter goes (leave empty to turn it off).")
+@instrumented
+async def tavern_ambience_channel(interaction: discord.Interaction, channel: discord.TextChannel = None):
+    config = guild_configs.update(interaction.guild_id, ambience_channel=channel.id if channel else None)
+    await interaction.response.send_message(describe_config(config), ephemeral=True)
+
+@tavern_config.command(name="persona", description="Extra personality notes for Quintin here (leave empty to clear).")
+@instrumented
+async def tavern_persona(interaction: discord.Interaction, notes: str = ""):
+    config = guild_configs.update(interaction.guild_id, persona=notes.strip()[:500])
+    await interaction.response.send_message(describe_config(config), ephemeral=True)
+
+bot.tree.add_command(tavern_config)
+
+@bot.tree.command(name="sync", description="Manually sync slash commands (admin only!)")
+@app_commands.default_permissions(administrator=True)
+@instrumented
 async def manual_sync(interaction: discord.Interaction):
-    await bot.tree.sync(guild=discord.Object(id=GUILD_ID))
-    await interaction.response.send_message("Slash commands synced!", ephemeral=True)
-
+    # Two sync calls can outlast Discord's 3s window, so acknowledge first.
+    await interaction.response.defer(ephemeral=True)
+    try:
+        await sync_commands(force=True)
+    except Exception as e:
+        record_error(e)
+        await interaction.followup.send(f"❌ Sync failed: {type(e).__name__}: {e}", ephemeral=True)
+        return
+    await interaction.followup.send("Slash commands synced!", ephemeral=True)
 
+startup.mark("setup")
 
 # 🔹 Run the bot
-bot.run(DISCORD_TOKEN)
+if __name__ == "__main__":
+    bot.run(DISCORD_TOKEN)
@@ -0,0 +1,201 @@
+import contextvars
+import functools
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# 🔹 Per-command latency spans, token usage, cache and error counters, rendered
+# as Prometheus text and (optionally) appended to a rolling JSON-lines trace.
+WINDOW = 1000                  # recent samples kept per (command, span) for quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+TRACE_FILE = os.getenv("METRICS_TRACE_FILE", "traces.jsonl")  # empty = no trace file
+TRACE_MAX_BYTES = int(os.getenv("METRICS_TRACE_MAX_BYTES", str(5 * 1024 * 1024)))
+
+_current_trace = contextvars.ContextVar("quintin_trace", default=None)
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Trace:
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.cache = {}
+        self.error = None
+        self.duration = None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "ts": round(self.started, 3),
+            "command": self.command,
+            "duration_ms": round(self.duration * 1000, 2),
+            "spans_ms": {name: round(s * 1000, 2) for name, s in self.spans.items()},
+            "tokens": self.tokens,
+            "cache": self.cache,
+            "error": self.error,
+        })
+
+
+class Metrics:
+    def __init__(self, trace_file=TRACE_FILE):
+        self.trace_file = trace_file
+        self._samples = defaultdict(lambda: deque(maxlen=WINDOW))  # (command, span) -> seconds
+        self._sums = defaultdict(float)
+        self._counts = defaultdict(int)
+        self._counters = defaultdict(int)  # (name, sorted label items) -> value
+        self._gauges = {}                  # (name, sorted label items) -> value
+
+    def observe(self, command: str, span: str, seconds: float):
+        key = (command, span)
+        self._samples[key].append(seconds)
+        self._sums[key] += seconds
+        self._counts[key] += 1
+
+    def inc(self, name: str, value=1, **labels):
+        self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def set(self, name: str, value: float, **labels):
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def total(self, name: str) -> float:
+        # A counter summed across all its labels.
+        return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    def finish(self, trace: Trace):
+        trace.duration = time.perf_counter() - trace._t0
+        self.observe(trace.command, "total", trace.duration)
+        for name, seconds in trace.spans.items():
+            self.observe(trace.command, name, seconds)
+        self.inc("quintin_commands_total", command=trace.command)
+        if trace.error:
+            self.inc("quintin_command_errors_total", command=trace.command)
+        if self.trace_file:
+            self._write_trace(trace)
+
+    def _write_trace(self, trace):
+        try:
+            if os.path.exists(self.trace_file) and os.path.getsize(self.trace_file) > TRACE_MAX_BYTES:
+                os.replace(self.trace_file, self.trace_file + ".1")
+            with open(self.trace_file, "a", encoding="utf-8") as f:
+                f.write(trace.to_json() + "\n")
+        except OSError as e:
+            print(f"⚠️ Couldn't write trace: {e}")
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP quintin_command_duration_seconds Time spent per command and span.",
+            "# TYPE quintin_command_duration_seconds summary",
+        ]
+        for (command, span), samples in sorted(self._samples.items()):
+            ordered = sorted(samples)
+            for q in QUANTILES:
+                labels = _labels(command=command, span=span, quantile=q)
+                lines.append(f"quintin_command_duration_seconds{labels} {_quantile(ordered, q):.6f}")
+            labels = _labels(command=command, span=span)
+            lines.append(f"quintin_command_duration_seconds_sum{labels} {self._sums[(command, span)]:.6f}")
+            lines.append(f"quintin_command_duration_seconds_count{labels} {self._counts[(command, span)]}")
+
+        for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+            by_name = defaultdict(list)
+            for (name, labels), value in sorted(values.items()):
+                by_name[name].append((labels, value))
+            for name, series in by_name.items():
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in series:
+                    lines.append(f"{name}{_labels(**dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class StartupTimer:
+    # Splits cold start into phases; each mark() closes the phase that just ran.
+    def __init__(self, started: float = None):
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.phases = {}
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+        metrics.set("quintin_startup_phase_seconds", round(self.phases[phase], 6), phase=phase)
+
+    def report(self) -> str:
+        total = self._last - self.started
+        parts = ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases.items())
+        return f"⏱️ Startup took {total:.2f}s ({parts})"
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def instrumented(func):
+    # Wraps a slash-command callback; discord.py still sees the original signature.
+    @functools.wraps(func)
+    async def wrapper(interaction, *args, **kwargs):
+        command = interaction.command.name if getattr(interaction, "command", None) else func.__name__
+        trace = Trace(command)
+        token = _current_trace.set(trace)
+        try:
+            return await func(interaction, *args, **kwargs)
+        except Exception as e:
+            trace.error = type(e).__name__
+            raise
+        finally:
+            _current_trace.reset(token)
+            metrics.finish(trace)
+
+    return wrapper
+
+
+@contextmanager
+def span(name: str):
+    trace = _current_trace.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.spans[name] = trace.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+def record_tokens(prompt_tokens: int, completion_tokens: int):
+    trace = _current_trace.get()
+    command = trace.command if trace else "background"
+    if trace:
+        trace.tokens["prompt"] += prompt_tokens
+        trace.tokens["completion"] += completion_tokens
+    metrics.inc("quintin_llm_tokens_total", prompt_tokens, command=command, kind="prompt")
+    metrics.inc("quintin_llm_tokens_total", completion_tokens, command=command, kind="completion")
+
+
+def record_cache(cache: str, hit: bool):
+    trace = _current_trace.get()
+    result = "hit" if hit else "miss"
+    if trace:
+        trace.cache[cache] = result
+    metrics.inc("quintin_cache_requests_total", cache=cache, result=result)
+
+
+def record_error(error: Exception):
+    # For handlers that catch their own exceptions and answer in character.
+    trace = _current_trace.get()
+    if trace:
+        trace.error = type(error).__name__
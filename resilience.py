@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+from metrics import metrics
+
+# 🔹 Latency-bounded LLM calls for the commands. Each call gets the command's
+# SLO as a hard deadline; a call that's slower than usual gets a second,
+# hedged copy and whichever answers first wins; and a circuit breaker stops
+# sending anything once OpenAI keeps failing, so commands can go straight to
+# local fallback content instead of waiting out a timeout first.
+DEFAULT_SLO = float(os.getenv("LLM_SLO", "10"))          # seconds, for commands without their own
+FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive failures that open it
+COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))         # seconds open before a probe call
+HEDGE_QUANTILE = 0.95    # hedge once a call is slower than this share of recent ones
+HEDGE_FRACTION = 0.5     # ...but never later than this fraction of the SLO
+MIN_HEDGE_AFTER = 1.0    # ...or sooner than this many seconds
+LATENCY_SAMPLES = 50     # recent successful calls remembered per command
+MIN_SAMPLES = 10         # until then, hedge at HEDGE_FRACTION of the SLO
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+
+class Unavailable(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason  # "circuit_open", "slow" or "error"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def _publish(self):
+        metrics.set("quintin_llm_circuit_open", {CLOSED: 0, HALF_OPEN: 0.5, OPEN: 1}[self.state])
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._publish()
+        if self.state == HALF_OPEN:
+            # One probe at a time; everyone else keeps getting fallbacks until it's back.
+            if self._probing:
+                return False
+            self._probing = True
+        return self.state != OPEN
+
+    def rejecting(self) -> bool:
+        # What allow() would say, without claiming the half-open probe.
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.cooldown
+        return self.state == HALF_OPEN and self._probing
+
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        if self.state != CLOSED:
+            print("✅ OpenAI is answering again, closing the circuit.")
+            self.state = CLOSED
+            self._publish()
+
+    def abandon(self):
+        # The caller gave up before we learned anything; let someone else probe.
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            print(f"🚧 OpenAI circuit open after {self.failures} failure(s); using local fallbacks for {self.cooldown:.0f}s.")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._publish()
+
+
+class LLMGuard:
+    def __init__(self, llm, breaker=None, default_slo=DEFAULT_SLO):
+        self.llm = llm
+        self.breaker = breaker or CircuitBreaker()
+        self.default_slo = default_slo
+        self._latencies = {}  # command -> recent successful call durations
+
+    @property
+    def healthy(self) -> bool:
+        # For background work: don't spend calls (or the half-open probe) while OpenAI is struggling.
+        return self.breaker.closed
+
+    def check(self, command: str):
+        # For handlers, before they queue for admission: with the circuit open
+        # the answer is local anyway, so don't spend rate-limit tokens or wait.
+        if self.breaker.rejecting():
+            metrics.inc("quintin_llm_guarded_total", command=command, result="circuit_open")
+            raise Unavailable("circuit_open")
+
+    def hedge_after(self, command: str, slo: float) -> float:
+        cap = slo * HEDGE_FRACTION
+        samples = self._latencies.get(command)
+        if not samples or len(samples) < MIN_SAMPLES:
+            return cap
+        ordered = sorted(samples)
+        slow = ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))]
+        return max(MIN_HEDGE_AFTER, min(slow, cap))
+
+    def _succeeded(self, command, seconds):
+        self.breaker.record_success()
+        self._latencies.setdefault(command, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+        metrics.inc("quintin_llm_guarded_total", command=command, result="ok")
+
+    def _failed(self, command, reason):
+        self.breaker.record_failure()
+        metrics.inc("quintin_llm_guarded_total", command=command, result=reason)
+        return Unavailable(reason)
+
+    async def call(self, command: str, make_call, slo: float = None):
+        # make_call() -> awaitable; it's called a second time for the hedge.
+        slo = slo or self.default_slo
+        if not self.breaker.allow():
+            metrics.inc("quintin_llm_guarded_total", command=command, result="circuit_open")
+            raise Unavailable("circuit_open")
+
+        started = time.monotonic()
+        deadline = started + slo
+        tasks = {asyncio.ensure_future(make_call())}
+        hedge_at = started + self.hedge_after(command, slo)
+        error = None
+        try:
+            while tasks:
+                hedging = len(tasks) == 1 and error is None and hedge_at < deadline
+                wait_until = hedge_at if hedging else deadline
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=max(0.0, wait_until - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self._succeeded(command, time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+                if done or not tasks:
+                    continue
+                if hedging and self.llm.in_flight < self.llm.max_in_flight:
+                    # Slower than usual: race a second copy rather than wait out the tail.
+                    metrics.inc("quintin_llm_hedges_total", command=command)
+                    tasks.add(asyncio.ensure_future(make_call()))
+                    hedge_at = deadline
+                elif hedging:
+                    hedge_at = deadline  # no spare capacity; just wait for the first
+                else:
+                    raise self._failed(command, "slow")
+            print(f"⚠️ {command}: OpenAI call failed ({type(error).__name__}: {error})")
+            raise self._failed(command, "error") from error
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, command: str, make_stream, slo: float = None):
+        # Streams can't be hedged once text is showing, so the SLO bounds the
+        # wait for the first token; after that the reply is on its way.
+        slo = slo or self.default_slo
+        if not self.breaker.allow():
+            metrics.inc("quintin_llm_guarded_total", command=command, result="circuit_open")
+            raise Unavailable("circuit_open")
+
+        started = time.monotonic()
+        deltas = make_stream()
+        try:
+            try:
+                first = await asyncio.wait_for(deltas.__anext__(), slo)
+            except asyncio.TimeoutError:
+                raise self._failed(command, "slow") from None
+            except StopAsyncIteration:
+                self._succeeded(command, time.monotonic() - started)
+                return
+            except Exception as e:
+                print(f"⚠️ {command}: OpenAI stream failed ({type(e).__name__}: {e})")
+                raise self._failed(command, "error") from e
+            yield first
+            try:
+                async for delta in deltas:
+                    yield delta
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self._succeeded(command, time.monotonic() - started)
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.abandon()
+            raise
+        finally:
+            await deltas.aclose()
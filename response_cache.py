@@ -0,0 +1,85 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+
+from metrics import record_cache
+
+# 🔹 Cache of finished LLM replies, so the same question about the same lore
+# doesn't pay for another round-trip. Commands opt in with their own TTL.
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+DEFAULT_TTL = 6 * 60 * 60
+CACHE_FILE = os.getenv("RESPONSE_CACHE_FILE")  # unset = memory only
+MAX_DISK_AGE = 7 * 24 * 60 * 60
+
+PUNCTUATION_RE = re.compile(r"[^\w\s']")
+
+
+def normalise_prompt(prompt: str) -> str:
+    return " ".join(PUNCTUATION_RE.sub(" ", prompt.lower().replace("’", "'")).split())
+
+
+def make_key(command: str, prompt: str, topics=(), lore: str = "") -> str:
+    lore_hash = hashlib.sha256(lore.encode("utf-8")).hexdigest()
+    raw = "\x1f".join([command, normalise_prompt(prompt), ",".join(sorted(topics)), lore_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=MAX_BYTES, path=CACHE_FILE):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (reply, created_at)
+        self._db = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, reply TEXT, created REAL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - MAX_DISK_AGE,))
+            self._db.commit()
+
+    @staticmethod
+    def _cost(key, reply):
+        return len(key) + len(reply.encode("utf-8"))
+
+    def get(self, key: str, ttl: float = DEFAULT_TTL):
+        entry = self._entries.get(key)
+        if entry is None and self._db is not None:
+            row = self._db.execute("SELECT reply, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                entry = row
+                self._remember(key, *row)
+
+        if entry is None or time.time() - entry[1] > ttl:
+            self.stats["misses"] += 1
+            record_cache("response", False)
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        record_cache("response", True)
+        return entry[0]
+
+    def put(self, key: str, reply: str):
+        created = time.time()
+        self._remember(key, reply, created)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, reply, created))
+            self._db.commit()
+
+    def _remember(self, key, reply, created):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= self._cost(key, old[0])
+        self._entries[key] = (reply, created)
+        self.size += self._cost(key, reply)
+        while self.size > self.max_bytes and self._entries:
+            old_key, (old_reply, _) = self._entries.popitem(last=False)
+            self.size -= self._cost(old_key, old_reply)
+            self.stats["evictions"] += 1
+
+
+response_cache = ResponseCache()
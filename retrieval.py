@@ -0,0 +1,178 @@
+import asyncio
+import re
+from typing import NamedTuple
+
+# 🔹 BM25 over paragraph chunks of the crawled lore, so prompts carry the
+# passages that matter instead of the first 2000 characters of a page.
+K1 = 1.5
+B = 0.75
+CHUNK_TOKENS = 120     # paragraphs are packed into chunks of roughly this size
+TOP_K = 4
+TOKEN_BUDGET = 500     # max estimated tokens of lore sent with a prompt
+TOPIC_BOOST = 0.5      # extra weight for passages from a page the prompt named
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her him his i in is it its me my "
+    "of on or she so that the their them they this to was we what when where who why "
+    "with you your about tell know does did do".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prose.
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> list:
+    words = []
+    for word in WORD_RE.findall(text.lower().replace("’", "'")):
+        if word.endswith("'s"):
+            word = word[:-2]
+        if word not in STOPWORDS:
+            words.append(word)
+    return words
+
+
+def chunk_paragraphs(paragraphs: list, size=CHUNK_TOKENS) -> list:
+    chunks, current, current_tokens = [], [], 0
+    for paragraph in paragraphs:
+        tokens = estimate_tokens(paragraph)
+        if current and current_tokens + tokens > size:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class Passage(NamedTuple):
+    title: str
+    url: str
+    text: str
+    score: float
+
+
+class RetrievalIndex:
+    def __init__(self):
+        self.version = None
+        # (url, hash) -> [(chunk_text, terms)], reused across rebuilds for unchanged pages
+        self._page_chunks = {}
+        # (passages, vocab, term_ptr, doc_ids, tfs, idf, norm), replaced as a whole on rebuild
+        self._index = ([], {}, None, None, None, None, None)
+        self._lock = asyncio.Lock()
+
+    def build(self, pages, version=None):
+        import numpy as np  # deferred: only needed once there's lore to index
+
+        page_chunks = {}
+        passages = []
+        chunk_terms = []
+        for url, title, digest, paragraphs in pages:
+            key = (url, digest)
+            chunks = self._page_chunks.get(key)
+            if chunks is None:
+                chunks = [(text, tokenize(title + "\n" + text)) for text in chunk_paragraphs(paragraphs)]
+            page_chunks[key] = chunks
+            for text, terms in chunks:
+                passages.append(Passage(title, url, text, 0.0))
+                chunk_terms.append(terms)
+
+        vocab = {}
+        rows, cols, counts = [], [], []
+        for doc, terms in enumerate(chunk_terms):
+            tf = {}
+            for term in terms:
+                tf[term] = tf.get(term, 0) + 1
+            for term, count in tf.items():
+                rows.append(vocab.setdefault(term, len(vocab)))
+                cols.append(doc)
+                counts.append(count)
+
+        # Postings laid out term-major (CSC) so a query only touches its own terms.
+        term_ids = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        doc_ids = np.asarray(cols, dtype=np.int64)[order]
+        tfs = np.asarray(counts, dtype=np.float32)[order]
+        term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=term_ptr[1:])
+
+        n_docs = len(chunk_terms)
+        doc_len = np.asarray([len(t) for t in chunk_terms], dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 1.0
+        df = np.diff(term_ptr).astype(np.float32)
+
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * doc_len / max(avg_len, 1.0))
+
+        # One assignment, so a concurrent search never sees a half-built index.
+        self._index = (passages, vocab, term_ptr, doc_ids, tfs, idf, norm)
+        self._page_chunks = page_chunks
+        self.version = version
+
+    @property
+    def passages(self) -> list:
+        return self._index[0]
+
+    def _scores(self, index, query):
+        import numpy as np
+
+        _, vocab, term_ptr, doc_ids, tfs, idf, norm = index
+        scores = np.zeros(len(norm), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = vocab.get(term)
+            if t is None:
+                continue
+            start, end = term_ptr[t], term_ptr[t + 1]
+            docs, tf = doc_ids[start:end], tfs[start:end]
+            scores[docs] += idf[t] * tf * (K1 + 1) / (tf + norm[docs])
+        return scores
+
+    def search(self, query: str, k=TOP_K, token_budget=TOKEN_BUDGET, boost_urls=()) -> list:
+        index = self._index
+        passages = index[0]
+        if not passages:
+            return []
+
+        import numpy as np
+
+        scores = self._scores(index, query)
+        if boost_urls:
+            boosted = np.fromiter((p.url in boost_urls for p in passages), dtype=bool, count=len(passages))
+            scores[boosted] = scores[boosted] * (1 + TOPIC_BOOST) + TOPIC_BOOST
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        top = candidates[np.argsort(-scores[candidates], kind="stable")][: k * 3]
+
+        results, used = [], 0
+        for i in top:
+            passage = passages[i]
+            cost = estimate_tokens(passage.text)
+            if used + cost > token_budget:
+                continue
+            results.append(passage._replace(score=float(scores[i])))
+            used += cost
+            if len(results) == k:
+                break
+        return results
+
+    async def refresh(self, store):
+        # Rebuild off the event loop when the compiled store has changed underneath us.
+        version = store.current_version()
+        if version == self.version:
+            return
+        async with self._lock:
+            if version == self.version:
+                return
+            pages = await asyncio.to_thread(store.all_pages)
+            await asyncio.to_thread(self.build, pages, version)
+
+
+def format_passages(passages: list) -> str:
+    return "\n\n".join(f"[{p.title}]\n{p.text}" for p in passages)
+
+
+retrieval_index = RetrievalIndex()
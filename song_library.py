@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import struct
+import time
+import wave
+from urllib.parse import parse_qs, urlparse
+
+# 🔹 The /sing songbook: the assets folder is indexed once (and again whenever
+# its mtime changes) with titles and durations, and each song's Discord
+# attachment URL is remembered after its first upload so later plays send a
+# link instead of the whole file.
+SONG_FOLDER = "assets"
+SONG_EXTENSIONS = (".mp3", ".wav")
+LIBRARY_FILE = os.getenv("SONG_LIBRARY_FILE", "song_library.json")
+TRANSCODE = os.getenv("SING_TRANSCODE", "1") == "1"   # upload an Opus copy when ffmpeg is around
+OPUS_BITRATE = os.getenv("SING_OPUS_BITRATE", "64k")
+URL_EXPIRY_MARGIN = 60 * 60  # seconds; Discord CDN links are signed and expire
+
+MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1 layer III
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2/2.5 layer III
+}
+
+
+def song_title(filename: str) -> str:
+    return os.path.splitext(filename)[0].replace("_", " ").title()
+
+
+def format_duration(seconds) -> str:
+    if not seconds:
+        return ""
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def _mp3_duration(path):
+    # Good enough for the songbook: bitrate of the first frame against the file size.
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        offset = 0
+        if head[:3] == b"ID3":
+            offset = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+        f.seek(offset)
+        data = f.read(4096)
+    for i in range(len(data) - 3):
+        if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+            header = struct.unpack(">I", data[i:i + 4])[0]
+            version = 1 if (header >> 19) & 0b11 == 0b11 else 2
+            bitrate = MP3_BITRATES[version][(header >> 12) & 0xF] if (header >> 12) & 0xF < 15 else 0
+            if bitrate:
+                return (size - offset - i) * 8 / (bitrate * 1000)
+    return None
+
+
+def _ffprobe_duration(path):
+    import subprocess
+
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=10,
+        )
+        return float(out.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def probe_duration(path):
+    try:
+        if path.endswith(".wav"):
+            with wave.open(path, "rb") as w:
+                return w.getnframes() / w.getframerate()
+        if shutil.which("ffprobe"):
+            return _ffprobe_duration(path)
+        if path.endswith(".mp3"):
+            return _mp3_duration(path)
+    except (OSError, EOFError, wave.Error, struct.error):
+        pass
+    return None
+
+
+def url_expires_at(url: str):
+    # Discord CDN URLs carry their expiry as a hex unix timestamp in `ex`.
+    ex = parse_qs(urlparse(url).query).get("ex")
+    try:
+        return int(ex[0], 16) if ex else None
+    except ValueError:
+        return None
+
+
+class Song:
+    __slots__ = ("filename", "path", "title", "size", "mtime", "duration", "url", "url_expires")
+
+    def __init__(self, filename, path, size, mtime, duration=None, url=None, url_expires=None):
+        self.filename = filename
+        self.path = path
+        self.title = song_title(filename)
+        self.size = size
+        self.mtime = mtime
+        self.duration = duration
+        self.url = url
+        self.url_expires = url_expires
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "mtime": self.mtime,
+            "duration": self.duration,
+            "url": self.url,
+            "url_expires": self.url_expires,
+        }
+
+
+class SongLibrary:
+    def __init__(self, folder=SONG_FOLDER, state_file=LIBRARY_FILE, transcode=TRANSCODE):
+        self.folder = folder
+        self.state_file = state_file
+        self.transcode = transcode
+        self.songs = []
+        self._version = None
+        self._saved = self._load_state()
+        self.stats = {"uploads": 0, "links": 0, "transcoded": 0}
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        state = {song.filename: song.to_dict() for song in self.songs}
+        tmp = self.state_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp, self.state_file)
+            self._saved = state
+        except OSError as e:
+            print(f"⚠️ Couldn't save the songbook: {e}")
+
+    def refresh(self) -> bool:
+        # A cheap stat on the folder; only a changed folder gets rescanned.
+        try:
+            version = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            self.songs, self._version = [], None
+            return False
+        if version == self._version:
+            return False
+
+        songs = []
+        for entry in sorted(os.scandir(self.folder), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith(SONG_EXTENSIONS):
+                continue
+            stat = entry.stat()
+            saved = self._saved.get(entry.name, {})
+            if saved.get("size") == stat.st_size and saved.get("mtime") == stat.st_mtime:
+                song = Song(entry.name, entry.path, stat.st_size, stat.st_mtime,
+                            saved.get("duration"), saved.get("url"), saved.get("url_expires"))
+            else:
+                # New or replaced file: any old upload link points at the old audio.
+                song = Song(entry.name, entry.path, stat.st_size, stat.st_mtime, probe_duration(entry.path))
+            songs.append(song)
+
+        self.songs = songs
+        self._version = version
+        self._save_state()
+        print(f"🎵 Songbook indexed: {len(songs)} songs")
+        return True
+
+    def pick(self):
+        self.refresh()
+        return random.choice(self.songs) if self.songs else None
+
+    def cached_url(self, song: Song):
+        if not song.url:
+            return None
+        if song.url_expires and song.url_expires - time.time() < URL_EXPIRY_MARGIN:
+            return None
+        self.stats["links"] += 1
+        return song.url
+
+    def remember_upload(self, song: Song, url: str):
+        song.url = url
+        song.url_expires = url_expires_at(url)
+        self.stats["uploads"] += 1
+        self._save_state()
+
+    async def upload_path(self, song: Song) -> str:
+        # The file to attach: a smaller Opus copy if ffmpeg can make one, else the original.
+        if not self.transcode or not shutil.which("ffmpeg"):
+            return song.path
+        base = os.path.splitext(song.filename)[0]
+        target = os.path.join(self.folder, ".opus", f"{base}.ogg")
+        if not os.path.exists(target) or os.path.getmtime(target) < song.mtime:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-y", "-loglevel", "error", "-i", song.path,
+                "-vn", "-c:a", "libopus", "-b:a", OPUS_BITRATE, target + ".tmp.ogg",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, err = await process.communicate()
+            if process.returncode != 0:
+                print(f"⚠️ Opus transcode failed for {song.filename}: {err.decode(errors='replace').strip()}")
+                return song.path
+            os.replace(target + ".tmp.ogg", target)
+            self.stats["transcoded"] += 1
+        return target if os.path.getsize(target) < song.size else song.path
+
+
+song_library = SongLibrary()
@@ -0,0 +1,98 @@
+import os
+import time
+
+# 🔹 Streams an LLM reply into Discord by editing followup messages as tokens
+# arrive. Edits are coalesced to stay well inside Discord's rate limits
+# (roughly 5 edits per 5s per channel), and long replies roll over into new
+# messages at the 2000-character limit.
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") == "1"
+EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))  # min seconds between edits
+MIN_DELTA = int(os.getenv("STREAM_MIN_DELTA", "60"))            # min new characters per edit
+MESSAGE_LIMIT = 2000
+CURSOR = " ▌"
+EMPTY_REPLY = "*Quintin opens his mouth, thinks better of it, and goes back to polishing a mug.*"
+
+
+def split_message(text: str, limit=MESSAGE_LIMIT) -> list:
+    # Break at the last newline or space before the limit so words stay whole.
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut < limit // 2:
+            cut = text.rfind(" ", 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    chunks.append(text)
+    return chunks
+
+
+class StreamingReply:
+    def __init__(self, followup, prefix: str = "", interval=EDIT_INTERVAL, min_delta=MIN_DELTA, empty=EMPTY_REPLY):
+        self.followup = followup
+        self.prefix = prefix
+        self.empty = empty  # shown if the stream ends without any text, so the deferred reply still resolves
+        self.interval = interval
+        self.min_delta = min_delta
+        self.text = ""
+        self.messages = []   # WebhookMessages sent so far, in order
+        self._shown = []     # what each of them currently shows
+        self._last_flush = 0.0
+        self._flushed_len = 0
+        self.edits = 0
+
+    async def feed(self, delta: str):
+        self.text += delta
+        due = time.monotonic() - self._last_flush >= self.interval
+        if due and len(self.text) - self._flushed_len >= self.min_delta:
+            await self._flush(final=False)
+
+    async def finish(self) -> str:
+        await self._flush(final=True)
+        return self.text
+
+    async def abandon(self):
+        # The stream broke part-way: leave what was already shown, minus the cursor, and let
+        # the caller send its apology underneath. Nothing is sent if nothing was shown yet.
+        if not self.messages:
+            return
+        self.empty = ""
+        try:
+            await self._flush(final=True)
+        except Exception as e:
+            print(f"⚠️ Couldn't tidy up a broken stream: {type(e).__name__}: {e}")
+
+    async def _flush(self, final: bool):
+        text = self.text.strip()
+        body = self.prefix + ((text or self.empty) if final else text)
+        if not body:
+            return
+        chunks = split_message(body if final else body + CURSOR)
+        for i, chunk in enumerate(chunks):
+            if i < len(self.messages):
+                if self._shown[i] != chunk:
+                    await self.messages[i].edit(content=chunk)
+                    self._shown[i] = chunk
+                    self.edits += 1
+            else:
+                self.messages.append(await self.followup.send(chunk, wait=True))
+                self._shown.append(chunk)
+        # The cursor can push a body over the limit into a message of its own; drop any that are no longer needed.
+        for message in self.messages[len(chunks):]:
+            await message.delete()
+        del self.messages[len(chunks):], self._shown[len(chunks):]
+        self._last_flush = time.monotonic()
+        self._flushed_len = len(self.text)
+
+
+async def stream_reply(followup, deltas, prefix: str = "") -> str:
+    # Returns the streamed text, which is empty if the model sent nothing (EMPTY_REPLY was shown instead).
+    reply = StreamingReply(followup, prefix)
+    try:
+        async for delta in deltas:
+            await reply.feed(delta)
+    except Exception:
+        await reply.abandon()
+        raise
+    return await reply.finish()
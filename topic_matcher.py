@@ -0,0 +1,73 @@
+import re
+from urllib.parse import unquote_plus, urlparse
+
+# 🔹 Finds every lore topic mentioned in a prompt in one left-to-right pass over
+# its tokens, using a trie of names built once from lore_index.json + aliases.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+PARENTHESES_RE = re.compile(r"\([^)]*\)")
+
+
+def normalise_tokens(text: str) -> list:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower().replace("’", "'")):
+        if token.endswith("'s"):
+            token = token[:-2]
+        tokens.append(token)
+    return tokens
+
+
+def names_from_url(url: str) -> list:
+    # ".../Steve+Emberfoot+(Diamond)" -> ["steve emberfoot diamond", "steve emberfoot"]
+    page = unquote_plus(urlparse(url.strip()).path.rstrip("/").rsplit("/", 1)[-1])
+    names = [" ".join(normalise_tokens(page))]
+    without_parens = " ".join(normalise_tokens(PARENTHESES_RE.sub(" ", page)))
+    if without_parens and without_parens not in names:
+        names.append(without_parens)
+    return names
+
+
+class TopicMatcher:
+    def __init__(self, phrases: dict):
+        # phrases: "steve emberfoot" -> "steve"
+        self._trie = {}
+        for phrase, topic in phrases.items():
+            node = self._trie
+            for token in normalise_tokens(phrase):
+                node = node.setdefault(token, {})
+            if node is not self._trie:
+                node[None] = topic
+
+    @classmethod
+    def from_index(cls, lore_index: dict, aliases: dict = None):
+        phrases = {}
+        for key, url in lore_index.items():
+            for name in names_from_url(url):
+                phrases.setdefault(name, key)
+        for key in lore_index:
+            phrases[key] = key
+        for alias, key in (aliases or {}).items():
+            if key in lore_index:
+                phrases[alias] = key
+        return cls(phrases)
+
+    def find(self, text: str) -> list:
+        # Leftmost-longest, non-overlapping matches; each topic reported once, in order.
+        tokens = normalise_tokens(text)
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            match, match_end = None, i
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if None in node:
+                    match, match_end = node[None], j
+            if match is None:
+                i += 1
+                continue
+            if match not in found:
+                found.append(match)
+            i = match_end
+        return found